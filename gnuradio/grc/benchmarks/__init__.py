@@ -0,0 +1,6 @@
+"""
+Standalone benchmarks of GRC on synthetic flow graphs.
+
+Each module is a script, run it from the top of the source tree, e.g.
+    python -m gnuradio.grc.benchmarks.export_data
+"""
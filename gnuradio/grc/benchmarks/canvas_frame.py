@@ -0,0 +1,132 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Time drawing frames of the canvas of a synthetic flow graph into an image,
+as the drawing area does: all elements, from cached tiles and while
+dragging a block. Also get the area queued for repainting per drag step.
+Needs GTK and a display, skipped otherwise.
+"""
+
+import itertools
+import sys
+
+from . import common
+
+try:
+    import gi
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('PangoCairo', '1.0')
+    from gi.repository import Gtk
+    import cairo
+    from ..gui.DrawingArea import DrawingArea
+except (ImportError, ValueError) as error:
+    Gtk = None
+    _import_error = error
+
+
+class RecordingDrawingArea(object):
+    """
+    Stands in for the drawing area of a flow graph.
+    Records the areas queued for repainting instead of repainting them.
+    """
+
+    ctrl_mask = mod1_mask = False
+
+    def __init__(self, zoom_factor, width, height):
+        self.zoom_factor = zoom_factor
+        self.viewport = cairo.RectangleInt(0, 0, width, height)
+        self.damaged = cairo.Region()
+
+    def queue_draw(self):
+        self.damaged.union(self.viewport)
+
+    def queue_draw_area(self, x, y, width, height):
+        self.damaged.union(cairo.RectangleInt(x, y, width, height))
+
+    queue_draw_extents = DrawingArea.queue_draw_extents if Gtk else None
+
+    def pop_damaged_pixels(self):
+        """Get the number of pixels of the viewport queued since the last call"""
+        damaged, self.damaged = self.damaged, cairo.Region()
+        damaged.intersect(self.viewport)
+        return sum(rect.width * rect.height for rect in (
+            damaged.get_rectangle(index) for index in range(damaged.num_rectangles())))
+
+
+def main():
+    parser = common.argument_parser(__doc__, blocks=2500, repeat=20)
+    parser.add_argument('-s', '--size', type=int, nargs=2, default=(1200, 800),
+                        metavar=('WIDTH', 'HEIGHT'), help='size of the viewport in pixels')
+    parser.add_argument('-z', '--zoom', type=float, default=1.0, help='zoom factor')
+    args = parser.parse_args()
+
+    if Gtk is None:
+        print('Skipped, GTK is not available: {}'.format(_import_error))
+        return
+    if not Gtk.init_check(sys.argv)[0]:
+        print('Skipped, no display')
+        return
+
+    from ..gui.Platform import Platform
+
+    width, height = args.size
+    zoom = args.zoom
+
+    Gtk.Application()  # the canvas looks up the (default) application
+    platform = common.make_platform(Platform, install_prefix=sys.prefix)
+    flow_graph = common.make_flow_graph(platform, args.blocks, args.blocks // 4)
+    flow_graph.drawing_area = drawing_area = RecordingDrawingArea(zoom, width, height)
+    print('{} blocks, {} connections'.format(len(flow_graph.blocks), len(flow_graph.connections)))
+
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+
+    def context():
+        cr = cairo.Context(surface)
+        cr.scale(zoom, zoom)
+        cr.set_line_width(2.0 / zoom)
+        return cr
+
+    flow_graph.update_drawing(context())
+
+    def draw_cold():
+        flow_graph._tile_cache.invalidate()  # render all tiles again
+        flow_graph.draw(context(), cached=True)
+
+    # drag the block closest to the center of the viewport, like the mouse does
+    center_x, center_y = width / 2 / zoom, height / 2 / zoom
+    block = min(flow_graph.blocks, key=lambda block: (
+        abs(block.coordinate[0] - center_x) + abs(block.coordinate[1] - center_y)))
+    deltas = itertools.cycle((10, -10))
+    damaged_pixels = []
+
+    def draw_drag():
+        x, y = flow_graph.coordinate
+        flow_graph.handle_mouse_motion((x + next(deltas), y))
+        damaged_pixels.append(drawing_area.pop_damaged_pixels())
+        flow_graph.draw(context(), cached=True)
+
+    common.report('frame all elements', common.timeit(
+        lambda: flow_graph.draw(context()), args.repeat))
+    common.report('frame tiles cold', common.timeit(draw_cold, args.repeat))
+    common.report('frame tiles warm', common.timeit(
+        lambda: flow_graph.draw(context(), cached=True), args.repeat))
+
+    flow_graph.selected_elements = {block}
+    flow_graph.update_selected()
+    flow_graph.coordinate = block.coordinate
+    flow_graph.mouse_pressed = True
+    drawing_area.pop_damaged_pixels()
+    common.report('frame dragging a block', common.timeit(draw_drag, args.repeat))
+    flow_graph.mouse_pressed = False
+
+    mean_pixels = sum(damaged_pixels) / len(damaged_pixels)
+    print('{:<40s} {:9.0f} px   {:5.1f} % of the viewport ({} px)'.format(
+        'repainted per drag step', mean_pixels, 100 * mean_pixels / (width * height),
+        width * height))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Helpers to build synthetic flow graphs and time operations on them.
+
+The platform is built from the blocks shipped with GRC and two benchmark
+blocks with stream ports, so no GNU Radio installation is needed.
+"""
+
+import argparse
+import collections
+import os
+import time
+
+from ..core.platform import Platform
+
+SINKS_PER_SOURCE = 4
+
+BLOCKS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'blocks')
+
+BENCHMARK_BLOCKS = [
+    {
+        'id': 'benchmark_source',
+        'label': 'Benchmark Source',
+        'flags': ['python', 'cpp'],
+        'parameters': [{'id': 'value', 'label': 'Value', 'dtype': 'float', 'default': '0'}],
+        'outputs': [{'domain': 'stream', 'dtype': 'float'}],
+        'templates': {
+            'imports': 'from gnuradio import analog',
+            'make': 'analog.sig_source_f(0, analog.GR_CONST_WAVE, 0, 0, ${value})',
+        },
+        'cpp_templates': {
+            'includes': ['#include <gnuradio/analog/sig_source.h>'],
+            'declarations': 'analog::sig_source_f::sptr ${id};',
+            'make': 'this->${id} = analog::sig_source_f::make(0, analog::GR_CONST_WAVE, 0, 0, ${value});',
+        },
+        'file_format': 1,
+    },
+    {
+        'id': 'benchmark_sink',
+        'label': 'Benchmark Sink',
+        'flags': ['python', 'cpp'],
+        'inputs': [{'domain': 'stream', 'dtype': 'float'}],
+        'templates': {
+            'imports': 'from gnuradio import blocks',
+            'make': 'blocks.null_sink(gr.sizeof_float)',
+        },
+        'cpp_templates': {
+            'includes': ['#include <gnuradio/blocks/null_sink.h>'],
+            'declarations': 'blocks::null_sink::sptr ${id};',
+            'make': 'this->${id} = blocks::null_sink::make(sizeof(float));',
+        },
+        'file_format': 1,
+    },
+]
+
+
+def make_platform(platform_class=Platform, **kwargs):
+    """
+    Get a platform with the blocks shipped with GRC and the benchmark blocks.
+
+    Args:
+        platform_class: the core platform or a subclass (e.g. of the GUI)
+        kwargs: further arguments of the platform class
+
+    Returns:
+        the platform, with its block library built
+    """
+    platform = platform_class(name='GRC Benchmark', version='v3.10.0.0',
+                              version_parts=('3', '10', '0'), **kwargs)
+    platform.build_library([BLOCKS_DIR])
+    for data in BENCHMARK_BLOCKS:
+        platform.load_block_description(dict(data), __file__)
+    return platform
+
+
+def make_flow_graph_data(num_blocks, num_connections=0, output_language='python'):
+    """
+    Get the nested data of a synthetic flow graph, as exported by a flow graph.
+    It has benchmark sources, each connected to up to SINKS_PER_SOURCE
+    benchmark sinks, and variables for the remaining blocks, laid out on a grid.
+
+    Args:
+        num_blocks: the number of blocks (besides the options block)
+        num_connections: the number of connections (limited by num_blocks)
+        output_language: 'python' or 'cpp'
+
+    Returns:
+        a nested data odict
+    """
+    blocks = []
+
+    def add_block(block_id, name, **parameters):
+        column, row = divmod(len(blocks), 50)
+        blocks.append(collections.OrderedDict([
+            ('name', name),
+            ('id', block_id),
+            ('parameters', parameters),
+            ('states', collections.OrderedDict([
+                ('coordinate', [200 * column, 100 * row]),
+                ('rotation', 0),
+                ('state', 'enabled'),
+            ])),
+        ]))
+
+    connections = []
+    num_connections = min(num_connections, num_blocks * SINKS_PER_SOURCE // (SINKS_PER_SOURCE + 1))
+    for index in range(num_connections):
+        source = 'source_{}'.format(index // SINKS_PER_SOURCE)
+        if index % SINKS_PER_SOURCE == 0:
+            add_block('benchmark_source', source, value=str(index))
+        add_block('benchmark_sink', 'sink_{}'.format(index))
+        connections.append([source, '0', 'sink_{}'.format(index), '0'])
+    for index in range(num_blocks - len(blocks)):
+        add_block('variable', 'variable_{}'.format(index), value=str(index))
+
+    return collections.OrderedDict([
+        ('options', {
+            'parameters': {
+                'id': 'benchmark',
+                'generate_options': 'no_gui',
+                'output_language': output_language,
+            },
+            'states': {'coordinate': [0, 0], 'rotation': 0, 'state': 'enabled'},
+        }),
+        ('blocks', blocks),
+        ('connections', connections),
+        ('metadata', {'file_format': 1}),
+    ])
+
+
+def make_flow_graph(platform, num_blocks, num_connections=0, output_language='python'):
+    """Get a synthetic flow graph (see make_flow_graph_data), rewritten and validated"""
+    flow_graph = platform.make_flow_graph()
+    flow_graph.import_data(make_flow_graph_data(num_blocks, num_connections, output_language))
+    flow_graph.rewrite()
+    flow_graph.validate()
+    return flow_graph
+
+
+def timeit(function, repeat=5):
+    """
+    Time a function.
+
+    Args:
+        function: the function to call (without arguments)
+        repeat: the number of calls
+
+    Returns:
+        the best and the mean duration in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations), sum(durations) / len(durations)
+
+
+def report(name, durations):
+    best, mean = durations
+    print('{:<40s} best {:9.2f} ms   mean {:9.2f} ms'.format(name, best * 1e3, mean * 1e3))
+
+
+def argument_parser(description, blocks=1000, repeat=5):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-n', '--blocks', type=int, default=blocks,
+                        help='number of blocks in the synthetic flow graph')
+    parser.add_argument('-r', '--repeat', type=int, default=repeat,
+                        help='number of timed runs')
+    return parser
@@ -0,0 +1,87 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Time converting python values of variables to C++ literals: the former
+get_cpp_value, which concatenated strings, against the current one,
+on a vector of complex taps and a nested list.
+"""
+
+from . import common
+from ..core import blocks
+
+
+def old_get_cpp_value(block, pyval):
+    """Block.get_cpp_value as it was, concatenating strings"""
+    if type(pyval) == int or type(pyval) == float:
+        return str(pyval)
+
+    elif type(pyval) == bool:
+        return str(pyval)[0].lower() + str(pyval)[1:]
+
+    elif type(pyval) == complex:
+        block.cpp_templates['includes'].append(
+            '#include <gnuradio/gr_complex.h>')
+        return '{' + str(pyval.real) + ', ' + str(pyval.imag) + '}'
+
+    elif type(pyval) == list:
+        block.cpp_templates['includes'].append('#include <vector>')
+        val_str = '{'
+        for element in pyval:
+            val_str += old_get_cpp_value(block, element) + ', '
+
+        if len(val_str) > 1:
+            # truncate to trim superfluous ', ' from the end
+            val_str = val_str[0:-2]
+
+        return val_str + '}'
+
+    elif type(pyval) == dict:
+        block.cpp_templates['includes'].append('#include <map>')
+        val_str = '{'
+        for key in pyval:
+            val_str += '{' + old_get_cpp_value(block, key) + \
+                ', ' + old_get_cpp_value(block, pyval[key]) + '}, '
+
+        if len(val_str) > 1:
+            # truncate to trim superfluous ', ' from the end
+            val_str = val_str[0:-2]
+
+        return val_str + '}'
+
+    block.cpp_templates['includes'].append('#include <string>')
+    return '"' + pyval + '"'
+
+
+def main():
+    parser = common.argument_parser(__doc__, repeat=10)
+    parser.add_argument('-t', '--taps', type=int, default=10000,
+                        help='number of complex taps')
+    args = parser.parse_args()
+    platform = common.make_platform()
+    flow_graph = common.make_flow_graph(platform, 1)
+    block = flow_graph.blocks[-1]
+
+    values = {
+        'complex taps': [complex(index, -index) / 7 for index in range(args.taps)],
+        'nested list': [[[row * 100 + column, float(column)] for column in range(100)]
+                        for row in range(args.taps // 100)],
+    }
+    for name, value in values.items():
+        for implementation, get_cpp_value in (
+                ('old', lambda value: old_get_cpp_value(block, value)),
+                ('new', lambda value: block.get_cpp_value(value))):
+
+            def convert():
+                block.cpp_templates = blocks.MakoTemplates(_bind_to=block, includes=[])
+                return get_cpp_value(value)
+
+            common.report('{} {}'.format(name, implementation), common.timeit(convert, args.repeat))
+        block.cpp_templates = blocks.MakoTemplates(_bind_to=block, includes=[])
+        assert old_get_cpp_value(block, value) == block.get_cpp_value(value)
+
+
+if __name__ == '__main__':
+    main()
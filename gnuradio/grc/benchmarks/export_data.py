@@ -0,0 +1,41 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Time exporting the data of a synthetic flow graph: without cached block
+data, unchanged and after changing a single block.
+"""
+
+import itertools
+
+from . import common
+
+
+def main():
+    args = common.argument_parser(__doc__, blocks=1000, repeat=20).parse_args()
+    platform = common.make_platform()
+    flow_graph = common.make_flow_graph(platform, args.blocks, args.blocks // 4)
+    print('{} blocks, {} connections'.format(len(flow_graph.blocks), len(flow_graph.connections)))
+
+    def export_cold():
+        for block in flow_graph.blocks:
+            block._export_data = None  # drop the cached data
+        flow_graph.export_data()
+
+    param = flow_graph.blocks[-1].params['value']
+    values = itertools.cycle(('1', '2'))
+
+    def export_changed():
+        param.set_value(next(values))
+        flow_graph.export_data()
+
+    flow_graph.export_data()
+    common.report('export cold', common.timeit(export_cold, args.repeat))
+    common.report('export unchanged', common.timeit(flow_graph.export_data, args.repeat))
+    common.report('export one block changed', common.timeit(export_changed, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Time saving and loading a synthetic flow graph as YAML (.grc) and binary (.grcb).
+"""
+
+import os
+import tempfile
+
+from . import common
+
+
+def main():
+    args = common.argument_parser(__doc__, blocks=5000, repeat=3).parse_args()
+    platform = common.make_platform()
+    flow_graph = common.make_flow_graph(platform, args.blocks, args.blocks // 4)
+    print('{} blocks, {} connections'.format(len(flow_graph.blocks), len(flow_graph.connections)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in ('.grc', '.grcb'):
+            filename = os.path.join(directory, 'benchmark' + extension)
+            common.report('save ' + extension, common.timeit(
+                lambda: platform.save_flow_graph(filename, flow_graph), args.repeat))
+            common.report('parse ' + extension, common.timeit(
+                lambda: platform.parse_flow_graph(filename), args.repeat))
+            print('{:<40s} {:9.1f} kB'.format('size ' + extension, os.path.getsize(filename) / 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Time generating the code of a synthetic flow graph with many connections,
+in Python and C++.
+"""
+
+import tempfile
+
+from . import common
+from ..core.generator import Generator
+
+
+def main():
+    parser = common.argument_parser(__doc__, blocks=2500, repeat=3)
+    parser.add_argument('-c', '--connections', type=int, default=2000,
+                        help='number of connections')
+    args = parser.parse_args()
+    platform = common.make_platform()
+
+    for language in ('python', 'cpp'):
+        flow_graph = common.make_flow_graph(platform, args.blocks, args.connections, language)
+        print('{}: {} blocks, {} connections'.format(
+            language, len(flow_graph.blocks), len(flow_graph.connections)))
+        with tempfile.TemporaryDirectory() as directory:
+            generator = Generator(flow_graph, directory)
+            common.report('connections ' + language, common.timeit(
+                generator._connections, args.repeat))
+            common.report('generate ' + language, common.timeit(
+                generator.write, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
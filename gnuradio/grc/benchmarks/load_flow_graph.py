@@ -0,0 +1,51 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Time parsing and loading a synthetic .grc file with many blocks,
+with and without streaming the blocks section, and get the peak memory
+used while loading.
+"""
+
+import os
+import tempfile
+import tracemalloc
+
+from . import common
+
+
+def main():
+    args = common.argument_parser(__doc__, blocks=5000, repeat=3).parse_args()
+    platform = common.make_platform()
+    flow_graph = common.make_flow_graph(platform, args.blocks, args.blocks // 4)
+    print('{} blocks, {} connections'.format(len(flow_graph.blocks), len(flow_graph.connections)))
+
+    def parse(filename, stream_blocks):
+        data = platform.parse_flow_graph(filename, stream_blocks=stream_blocks)
+        list(data['blocks'])
+        return data['connections']
+
+    def load(filename, stream_blocks):
+        loaded = platform.make_flow_graph()
+        loaded.import_data(platform.parse_flow_graph(filename, stream_blocks=stream_blocks))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'benchmark.grc')
+        platform.save_flow_graph(filename, flow_graph)
+
+        for stream_blocks, mode in ((False, ''), (True, ' streamed')):
+            common.report('parse' + mode, common.timeit(
+                lambda: parse(filename, stream_blocks), args.repeat))
+            common.report('load' + mode, common.timeit(
+                lambda: load(filename, stream_blocks), args.repeat))
+            tracemalloc.start()
+            load(filename, stream_blocks)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('{:<40s} {:9.1f} MB'.format('peak memory load' + mode, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
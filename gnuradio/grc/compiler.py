@@ -0,0 +1,235 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Headless compiler for .grc files.
+
+The block library is built once. The flow graphs are then generated in a pool
+of worker processes, hier blocks before the flow graphs using them.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import time
+
+from .core import Messages
+from .core.platform import Platform
+
+
+BuildResult = collections.namedtuple(
+    'BuildResult', 'file_path output_path duration error messages')
+
+# the platform of the current (worker) process
+_platform = None
+_loaded_block_files = set()
+
+
+def make_platform():
+    from gnuradio import gr
+    return Platform(
+        name='GNU Radio Companion Compiler',
+        prefs=gr.prefs(),
+        version=gr.version(),
+        version_parts=(gr.major_version(), gr.api_version(),
+                       gr.minor_version())
+    )
+
+
+def _init_worker():
+    """Build the library, unless it was inherited from the parent process"""
+    global _platform
+    if _platform is None:
+        _platform = make_platform()
+        _platform.build_library()
+
+
+def _scan_flow_graph(file_path):
+    """
+    Get the hier block a flow graph provides and the blocks it uses.
+
+    Returns:
+        a tuple (file_path, provided block id or None, set of used block ids)
+    """
+    try:
+        data = _platform.parse_flow_graph(file_path)
+    except Exception:
+        return file_path, None, set()  # reported when compiling
+    options = data.get('options', {}).get('parameters', {})
+    provides = None
+    if str(options.get('generate_options', '')).startswith('hb'):
+        provides = options.get('id')
+    uses = {block_data['id'] for block_data in data.get('blocks', [])}
+    return file_path, provides, uses
+
+
+def _compile_flow_graph(file_path, out_dir, block_files):
+    """Generate a single flow graph in this (worker) process"""
+    platform = _platform
+    messages = []
+    Messages.MESSENGERS_LIST[:] = [messages.append]
+
+    for block_file in block_files:
+        if block_file in _loaded_block_files:
+            continue
+        # skip hier blocks generated by this worker
+        if not any(block_cls.loaded_from == block_file for block_cls in platform.blocks.values()):
+            platform.load_generated_block(block_file)
+        _loaded_block_files.add(block_file)
+
+    start = time.perf_counter()
+    try:
+        _, output_path = platform.load_and_generate_flow_graph(
+            file_path, out_dir)
+        error = None if output_path else 'Failed to compile'
+    except Exception as e:
+        output_path, error = None, str(e)
+    duration = time.perf_counter() - start
+
+    return BuildResult(file_path, output_path, duration, error, ''.join(messages))
+
+
+def _block_file_of(output_path):
+    """Find the .block.yml written next to a generated hier block"""
+    base = output_path[:-3] if output_path.endswith('.py') else output_path
+    block_file = base + '.block.yml'
+    return block_file if os.path.exists(block_file) else None
+
+
+def sort_by_dependencies(scans):
+    """
+    Group flow graphs into levels, hier blocks before their users.
+    Files in cyclic dependencies are put into the last level.
+
+    Args:
+        scans: a list of tuples as returned by _scan_flow_graph
+
+    Returns:
+        a list of lists of file paths
+    """
+    providers = {provides: file_path for file_path, provides, _ in scans if provides}
+    depends = {
+        file_path: {providers[block_id] for block_id in uses
+                    if block_id in providers and providers[block_id] != file_path}
+        for file_path, _, uses in scans
+    }
+
+    levels = []
+    done = set()
+    while len(done) < len(depends):
+        level = [file_path for file_path, deps in depends.items()
+                 if file_path not in done and deps <= done]
+        if not level:
+            level = [file_path for file_path in depends if file_path not in done]
+            Messages.send('>>> Warning: cyclic hier_block dependency in:\n    {}\n'.format(
+                '\n    '.join(level)))
+        levels.append(sorted(level))
+        done.update(level)
+    return levels
+
+
+def compile_flow_graphs(platform, grc_files, out_dir, jobs=None):
+    """
+    Compile many flow graphs in parallel.
+
+    Args:
+        platform: a platform with the block library already built
+        grc_files: a list of .grc files
+        out_dir: the output directory for top blocks
+        jobs: number of worker processes (default: cpu count, 1: in-process)
+
+    Returns:
+        a list of BuildResult in build order
+    """
+    global _platform
+    # forked workers share the library snapshot of this process
+    _platform = platform
+    grc_files = [os.path.abspath(file_path) for file_path in grc_files]
+    out_dir = os.path.abspath(out_dir)
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker)
+
+    results = []
+    messengers = list(Messages.MESSENGERS_LIST)
+    try:
+        with executor:
+            scans = list(executor.map(_scan_flow_graph, grc_files))
+            block_files = []
+            for level in sort_by_dependencies(scans):
+                futures = [executor.submit(_compile_flow_graph, file_path, out_dir, list(block_files))
+                           for file_path in level]
+                for future in futures:
+                    result = future.result()
+                    results.append(result)
+                    if result.output_path:
+                        block_file = _block_file_of(result.output_path)
+                        if block_file:
+                            block_files.append(block_file)
+    finally:
+        Messages.MESSENGERS_LIST[:] = messengers
+
+    return results
+
+
+def argument_parser():
+    parser = argparse.ArgumentParser(description=(
+        "Compile GRC files (.grc) into GNU Radio programs."
+    ))
+    parser.add_argument("-o", "--output", metavar='DIR', default='.',
+                        help="Output directory for compiled programs [default=%(default)s]")
+    parser.add_argument("-u", "--user-lib-dir", action='store_true', default=False,
+                        help="Output to default hier_block library (overwrites -o)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of worker processes [default=number of CPUs]")
+    parser.add_argument(metavar="GRC_FILE", dest='grc_files', nargs='+',
+                        help=".grc files to compile")
+    return parser
+
+
+def main(args=None):
+    args = args or argument_parser().parse_args()
+
+    for grc_file in args.grc_files:
+        if not os.path.exists(grc_file):
+            sys.exit('Error: missing ' + grc_file)
+
+    start = time.perf_counter()
+    platform = make_platform()
+    platform.build_library()
+    Messages.send('>>> Library built in {:.2f}s\n'.format(time.perf_counter() - start))
+
+    out_dir = args.output if not args.user_lib_dir else platform.config.hier_block_lib_dir
+    if os.path.exists(out_dir):
+        pass  # all is well
+    elif args.user_lib_dir:
+        os.mkdir(out_dir)  # create missing hier_block lib directory
+    else:
+        sys.exit('Error: Invalid output directory')
+
+    results = compile_flow_graphs(platform, args.grc_files, out_dir, args.jobs)
+
+    failed = [result for result in results if result.error]
+    for result in results:
+        status = 'FAILED' if result.error else 'ok'
+        Messages.send('{:>8.2f}s  {:<6} {}\n'.format(
+            result.duration, status, result.file_path))
+    for result in failed:
+        Messages.send('\n>>> {}: {}\n{}'.format(
+            result.file_path, result.error, result.messages))
+    Messages.send('>>> Compiled {} of {} flow graphs in {:.2f}s\n'.format(
+        len(results) - len(failed), len(results), time.perf_counter() - start))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
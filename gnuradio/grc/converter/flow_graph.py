@@ -6,17 +6,131 @@
 
 
 import ast
+import hashlib
+import io
+import json
+import logging
+import os
 from collections import OrderedDict
 
+from ..core import Constants
 from ..core.io import yaml
 from . import xml
 
+logger = logging.getLogger(__name__)
+
+# converted flow graphs, by hash of the xml file
+CACHE_DIR = os.path.join(os.path.dirname(Constants.CACHE_FILE), 'converted')
+# change to invalidate the cache if the conversion changes
+CACHE_VERSION = 1
+# number of converted flow graphs to keep, the least recently used are removed
+CACHE_SIZE = 50
+
 
 def from_xml(filename):
-    """Load flow graph from xml file"""
-    element, version_info = xml.load(filename, 'flow_graph.dtd')
+    """
+    Load flow graph from xml file.
+    The whole file is converted (or read from the cache) before returning.
+    """
+    with open(filename, 'rb') as fp:
+        content = fp.read()
+    cache_file = os.path.join(CACHE_DIR, '{}-{}.json'.format(
+        hashlib.sha1(content).hexdigest(), CACHE_VERSION))
+
+    data = _load_cached(cache_file)
+    if data is None:
+        data = convert_flow_graph_xml_file(io.BytesIO(content))
+        _save_cached(cache_file, data)
+    return data
+
+
+def _load_cached(cache_file):
+    try:
+        with open(cache_file, encoding='utf-8') as fp:
+            data = json.load(fp, object_pairs_hook=OrderedDict)
+        # restore the flow style of the yaml output
+        for block in [data['options']] + data['blocks']:
+            block['states']['coordinate'] = yaml.ListFlowing(block['states']['coordinate'])
+        data['connections'] = [yaml.ListFlowing(c) for c in data['connections']]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    try:
+        os.utime(cache_file)  # mark as recently used
+    except OSError:
+        pass
+    return data
 
-    data = convert_flow_graph_xml(element)
+
+def _save_cached(cache_file, data):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        with open(tmp_file, 'w', encoding='utf-8') as fp:
+            fp.write(json.dumps(data))
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logger.warning('Can not cache converted flow graph: %s', e)
+        return
+    _prune_cache()
+
+
+def _prune_cache():
+    """Remove all but the CACHE_SIZE most recently used cache files"""
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR)
+                   if entry.name.endswith('.json')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[CACHE_SIZE:]:
+            os.remove(entry.path)
+    except OSError as e:
+        logger.debug('Can not prune the converted flow graph cache: %s', e)
+
+
+def iter_flow_graph_xml(source):
+    """
+    Convert a flow graph from xml element by element, without building
+    a tree of the whole document.
+
+    Args:
+        source: a file name or a binary file object
+
+    Yields:
+        tuples ('block', block data) and ('connection', connection data) in
+        file order, followed by ('version_info', dict of the grc tag)
+    """
+    version_info = {}
+    for version_info, element in xml.iterparse(source, ('block', 'connection')):
+        if element.tag == 'block':
+            yield 'block', convert_block(element)
+        elif element.tag == 'connection':
+            yield 'connection', convert_connection(element)
+    yield 'version_info', version_info
+
+
+def convert_flow_graph_xml_file(source):
+    """Convert a flow graph from xml, element by element"""
+    options = None
+    blocks = []
+    connections = []
+    version_info = {}
+    for kind, item in iter_flow_graph_xml(source):
+        if kind == 'block' and item['id'] == 'options' and options is None:
+            options = item
+            options.pop('id')
+        elif kind == 'block':
+            blocks.append(item)
+        elif kind == 'connection':
+            connections.append(item)
+        else:
+            version_info = item
+
+    if options is None:
+        raise ValueError('No options block in {}'.format(source))
+
+    data = OrderedDict()
+    data['options'] = options
+    data['blocks'] = blocks
+    data['connections'] = connections
     try:
         file_format = int(version_info['format'])
     except KeyError:
@@ -71,3 +71,39 @@ def load_stdlib(filename, document_type_def=None):
 
 
 load = load_lxml if HAVE_LXML else load_stdlib
+_ParseError = etree.LxmlError if HAVE_LXML else etree.ParseError
+
+
+def _processing_instruction(element):
+    """Get the target and pseudo-attributes of a processing instruction"""
+    if HAVE_LXML:
+        return element.target, dict(element.attrib)
+    inst = etree.fromstring('<' + element.text + '/>')
+    return inst.tag, dict(inst.attrib)
+
+
+def iterparse(source, tags):
+    """
+    Parse an xml document incrementally.
+
+    Args:
+        source: a file name or a binary file object
+        tags: the tags of the (not nested) elements to yield
+
+    Yields:
+        a tuple (version info, element) for each element with one of the tags,
+        right after it was parsed. The element is cleared afterwards.
+    """
+    version_info = {}
+    try:
+        for event, element in etree.iterparse(source, events=('end', 'pi')):
+            if event == 'end':
+                if element.tag in tags:
+                    yield version_info, element
+                    element.clear()
+            else:
+                target, attrib = _processing_instruction(element)
+                if target == 'grc':
+                    version_info.update(attrib)
+    except _ParseError:
+        raise ValueError("Failed to parse {}".format(source))
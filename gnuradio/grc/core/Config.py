@@ -50,6 +50,15 @@ class Config(object):
 
         return valid_paths
 
+    @property
+    def template_cache_dir(self):
+        """Directory for compiled Mako template modules ('' to disable)"""
+        path = (
+            os.environ.get('GRC_TEMPLATE_CACHE_DIR') or
+            self._gr_prefs.get_string('grc', 'template_cache_dir', '')
+        )
+        return normpath(expanduser(expandvars(path))) if path else ''
+
     @property
     def default_flow_graph(self):
         user_default = (
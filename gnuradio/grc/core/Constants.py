@@ -20,9 +20,13 @@ DATA_DIR = os.path.dirname(__file__)
 BLOCK_DTD = os.path.join(DATA_DIR, 'block.dtd')
 DEFAULT_FLOW_GRAPH = os.path.join(DATA_DIR, 'default_flow_graph.grc')
 DEFAULT_HIER_BLOCK_LIB_DIR = os.path.expanduser('~/.grc_gnuradio')
+HIER_BLOCK_CACHE_FILE_NAME = '.hier_block_cache.json'
 DEFAULT_FLOW_GRAPH_ID = 'default'
+# flow graph files with this extension are stored in a binary format
+BINARY_FLOW_GRAPH_FILE_EXTENSION = '.grcb'
 
 CACHE_FILE = os.path.expanduser('~/.cache/grc_gnuradio/cache_v2.json')
+TEMPLATE_CACHE_SIZE = 4096
 
 BLOCK_DESCRIPTION_FILE_FORMAT_VERSION = 1
 # File format versions:
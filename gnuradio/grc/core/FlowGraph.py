@@ -428,26 +428,131 @@ class FlowGraph(Element):
         del self.blocks[:]
         self.connections.clear()
 
-        file_format = data['metadata']['file_format']
-
         # build the blocks
         self.options_block.import_data(name='', **data.get('options', {}))
         self.blocks.append(self.options_block)
 
         for block_data in data.get('blocks', []):
-            block_id = block_data['id']
-            block = (
-                self.new_block(block_id) or
-                self._build_depending_hier_block(block_id) or
-                self.new_block(block_id='_dummy',
-                               missing_block_id=block_id, **block_data)
-            )
-
-            block.import_data(**block_data)
+            self._import_block(block_data)
 
         self.rewrite()
 
+        # the metadata is at the end of the file, read it after the blocks
+        file_format = data['metadata']['file_format']
+
         # build the connections
+        had_connect_errors = self._import_connections(
+            data.get('connections', []), file_format)
+
+        self._finish_import()
+        return had_connect_errors
+
+    def import_changes(self, options=None, blocks_data=(), connections=(),
+                       removed_blocks=(), removed_connections=()):
+        """
+        Import partial changes into this flow graph.
+        Only the given blocks and connections are touched, all others are kept.
+
+        Args:
+            options: the new options data or None
+            blocks_data: the data of added and modified blocks
+            connections: the data of added connections
+            removed_blocks: the names of the blocks to remove
+            removed_connections: the data of the connections to remove
+
+        Returns:
+            True if some connections could not be made
+        """
+        removed_connections = {tuple(c) for c in removed_connections}
+        for connection in list(self.connections):
+            if tuple(connection.export_data()) in removed_connections:
+                self.remove_element(connection)
+
+        _blocks = {block.name: block for block in self.blocks}
+        for name in removed_blocks:
+            self.remove_element(_blocks.pop(name))
+
+        if options is not None:
+            self.options_block.import_data(name='', **options)
+
+        for block_data in blocks_data:
+            block = _blocks.get(block_data['name'])
+            if block is not None and block.key == block_data['id']:
+                block.import_data(**block_data)
+            else:
+                if block is not None:
+                    self.remove_element(block)
+                self._import_block(block_data)
+
+        self.rewrite()
+        had_connect_errors = self._import_connections(
+            connections, FLOW_GRAPH_FILE_FORMAT_VERSION)
+        self._finish_import()
+        return had_connect_errors
+
+    def reload_blocks(self):
+        """
+        Update the blocks after the block library was rebuilt.
+        Blocks whose description did not change are kept and only get the
+        new block class. The others are rebuilt from their exported data.
+
+        Returns:
+            a tuple (the names of the rebuilt blocks,
+                     True if some connections could not be made)
+        """
+        changed = [block for block in self.blocks
+                   if not self._update_block_class(block)]
+        if not changed:
+            return [], False
+        if self.options_block in changed:
+            data = self.export_data()
+            self.options_block = self.parent_platform.make_block(self, 'options')
+            had_connect_errors = self.import_data(data)
+            return [block.name for block in self.blocks], had_connect_errors
+
+        connections = [connection.export_data() for connection in self.connections
+                       if connection.source_block in changed or connection.sink_block in changed]
+        names = [block.name for block in changed]
+        had_connect_errors = self.import_changes(
+            blocks_data=[block.export_data() for block in changed],
+            connections=connections,
+            removed_blocks=names,
+            removed_connections=connections,
+        )
+        return names, had_connect_errors
+
+    def _update_block_class(self, block):
+        """
+        Switch a block to the class in the block library, if the description is unchanged.
+
+        Returns:
+            False if the block has to be rebuilt
+        """
+        block_cls = type(block)
+        new_block_cls = self.parent_platform.block_classes.get(block.key)
+        if block.is_dummy_block:
+            return new_block_cls is None  # the missing block is available now
+        if new_block_cls is block_cls:
+            return True
+        if (new_block_cls is None or block_cls.loaded_data is None or
+                new_block_cls.loaded_data != block_cls.loaded_data):
+            return False
+        block.__class__ = new_block_cls
+        return True
+
+    def _import_block(self, block_data):
+        block_id = block_data['id']
+        block = (
+            self.new_block(block_id) or
+            self._build_depending_hier_block(block_id) or
+            self.new_block(block_id='_dummy',
+                           missing_block_id=block_id, **block_data)
+        )
+
+        block.import_data(**block_data)
+        return block
+
+    def _import_connections(self, connections, file_format):
         def verify_and_get_port(key, block, dir):
             ports = block.sinks if dir == 'sink' else block.sources
             for port in ports:
@@ -468,7 +573,7 @@ class FlowGraph(Element):
 
         try:
             # TODO: Add better error handling if no connections exist in the flowgraph file.
-            for src_blk_id, src_port_id, snk_blk_id, snk_port_id in data.get('connections', []):
+            for src_blk_id, src_port_id, snk_blk_id, snk_port_id in connections:
                 source_block = _blocks[src_blk_id]
                 sink_block = _blocks[snk_blk_id]
 
@@ -491,6 +596,9 @@ class FlowGraph(Element):
                     src_blk_id, src_port_id, snk_blk_id, snk_port_id, e))
             had_connect_errors = True
 
+        return had_connect_errors
+
+    def _finish_import(self):
         for block in self.blocks:
             if block.is_dummy_block:
                 block.rewrite()      # Make ports visible
@@ -501,7 +609,6 @@ class FlowGraph(Element):
                     'Block id "{}" not found.'.format(block.key))
 
         self.rewrite()  # global rewrite
-        return had_connect_errors
 
 
 def _update_old_message_port_keys(source_key, sink_key, source_block, sink_block):
@@ -9,11 +9,22 @@ These
 
 """
 
+import collections
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
 from mako.template import Template
 from mako.exceptions import SyntaxException
 
+from ..Constants import TEMPLATE_CACHE_SIZE
 from ..errors import TemplateError
 
+logger = logging.getLogger(__name__)
+
 # The utils dict contains convenience functions
 # that can be called from any template
 
@@ -28,9 +39,71 @@ def no_quotes(string, fallback=None):
 utils = {'no_quotes': no_quotes}
 
 
+class TemplateCache(object):
+    """
+    Bounded LRU cache of compiled templates keyed by their text.
+    Keeps hit/miss counters and the total time spent compiling.
+    """
+
+    def __init__(self, max_size=TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.compile_time = 0.0
+        self._templates = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, text):
+        with self._lock:
+            try:
+                template = self._templates[text]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._templates.move_to_end(text)
+            self.hits += 1
+            return template
+
+    def __setitem__(self, text, template):
+        with self._lock:
+            self._templates[text] = template
+            self._templates.move_to_end(text)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+
+    def __contains__(self, text):
+        return text in self._templates
+
+    def __len__(self):
+        return len(self._templates)
+
+    def add_compile_time(self, seconds):
+        with self._lock:
+            self.compile_time += seconds
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self.hits = self.misses = 0
+            self.compile_time = 0.0
+
+    def stats(self):
+        return {
+            'size': len(self._templates),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'compile_time': self.compile_time,
+        }
+
+
 class MakoTemplates(dict):
 
-    _template_cache = {}
+    _template_cache = TemplateCache()
+    # templates compiled without strict_undefined (connection templates)
+    _lenient_template_cache = TemplateCache()
+    # directory for compiled template modules, None disables persistence
+    module_directory = None
 
     def __init__(self, _bind_to=None, *args, **kwargs):
         self.instance = _bind_to
@@ -45,21 +118,119 @@ class MakoTemplates(dict):
         return copy
 
     @classmethod
-    def compile(cls, text):
+    def set_module_directory(cls, path):
+        """Persist compiled template modules in path (None to disable)"""
+        if path:
+            try:
+                os.makedirs(path, exist_ok=True)
+            except OSError:
+                path = None
+        cls.module_directory = path or None
+
+    @classmethod
+    def _cache(cls, strict_undefined):
+        return cls._template_cache if strict_undefined else cls._lenient_template_cache
+
+    @classmethod
+    def compile(cls, text, strict_undefined=True):
+        """
+        Compile a template and add it to the cache.
+
+        Args:
+            text: the template text
+            strict_undefined: raise a NameError for any undefined name when rendering,
+                              instead of passing mako's UNDEFINED (which only
+                              fails if it is written to the output)
+        """
         text = str(text)
+        cache = cls._cache(strict_undefined)
+        start = time.perf_counter()
         try:
-            template = Template(text, strict_undefined=True)
+            if cls.module_directory:
+                template = cls._compile_with_module_directory(text, strict_undefined)
+            else:
+                template = Template(text, strict_undefined=strict_undefined)
         except SyntaxException as error:
             raise TemplateError(text, *error.args)
+        finally:
+            cache.add_compile_time(time.perf_counter() - start)
 
-        cls._template_cache[text] = template
+        cache[text] = template
         return template
 
-    def _get_template(self, text):
+    @classmethod
+    def _compile_with_module_directory(cls, text, strict_undefined=True):
+        """
+        Mako only writes module files for file based templates.
+        Store the template text under its hash, so the compiled module
+        can be reused by later sessions.
+        """
+        uri = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        uri += '.mako' if strict_undefined else '.lenient.mako'
+        source = os.path.join(cls.module_directory, uri)
+        if not os.path.exists(source):
+            # unique per process and thread, prewarming may write the same text
+            fd, tmp = tempfile.mkstemp(suffix='.tmp', prefix=uri + '.', dir=cls.module_directory)
+            with open(fd, 'w', encoding='utf-8') as fp:
+                fp.write(text)
+            os.replace(tmp, source)
+        return Template(filename=source, uri=uri, input_encoding='utf-8',
+                        module_directory=cls.module_directory,
+                        strict_undefined=strict_undefined)
+
+    @classmethod
+    def cache_stats(cls):
+        """Get the combined stats of the strict and lenient template caches"""
+        stats = cls._template_cache.stats()
+        for key, value in cls._lenient_template_cache.stats().items():
+            stats[key] += value
+        return stats
+
+    @classmethod
+    def prewarm(cls, texts):
+        """
+        Compile the given template texts in a background thread.
+
+        Args:
+            texts: an iterable of template texts, consumed by the thread
+
+        Returns:
+            the started thread
+        """
+        def run():
+            seen = set()
+            for text in texts:
+                text = str(text) if text else ''
+                if not text or text in seen or text in cls._template_cache:
+                    continue
+                seen.add(text)
+                try:
+                    cls.compile(text)
+                except Exception as error:  # reported when the template is rendered
+                    logger.debug('Prewarming a template failed: %s', error)
+
+        thread = threading.Thread(target=run, name='grc-template-prewarm')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def texts(self):
+        """Iterate over all template texts held by this dict"""
+        for value in self.values():
+            if isinstance(value, list):
+                for text in value:
+                    if text:
+                        yield text
+            elif value:
+                yield value
+
+    @classmethod
+    def get_template(cls, text, strict_undefined=True):
+        """Get a compiled template from the cache, compile it if missing (see compile)"""
         try:
-            return self._template_cache[str(text)]
+            return cls._cache(strict_undefined)[str(text)]
         except KeyError:
-            return self.compile(text)
+            return cls.compile(text, strict_undefined)
 
     def render(self, item):
         text = self.get(item)
@@ -70,10 +241,10 @@ class MakoTemplates(dict):
 
         try:
             if isinstance(text, list):
-                templates = (self._get_template(t) for t in text)
+                templates = (self.get_template(t) for t in text)
                 return [template.render(**namespace) for template in templates]
             else:
-                template = self._get_template(text)
+                template = self.get_template(text)
                 return template.render(**namespace)
         except Exception as error:
             raise TemplateError(error, text)
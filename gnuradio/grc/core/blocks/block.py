@@ -12,7 +12,6 @@ import collections
 import itertools
 import copy
 
-import re
 
 import ast
 
@@ -31,6 +30,89 @@ def _get_elem(iterable, key):
     return ValueError('Key "{}" not found in {}.'.format(key, items))
 
 
+class _States(dict):
+    """The states of a block, which drop the export cache of the block on changes"""
+
+    __slots__ = ('_block',)
+
+    def __init__(self, block, *args, **kwargs):
+        self._block = block
+        dict.__init__(self, *args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if key not in self or self[key] != value:
+            self._block._export_data = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._block._export_data = None
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        self._block._export_data = None
+        dict.update(self, *args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        self._block._export_data = None
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._block._export_data = None
+        return dict.popitem(self)
+
+    def clear(self):
+        self._block._export_data = None
+        dict.clear(self)
+
+
+def _write_cpp_value(pyval, out, includes):
+    """
+    Append the C++ literal of pyval to the list out.
+    Required #include lines are added to the ordered dict includes.
+    """
+    pytype = type(pyval)
+    if pytype is int or pytype is float:
+        out.append(str(pyval))
+
+    elif pytype is bool:
+        out.append('true' if pyval else 'false')
+
+    elif pytype is complex:
+        includes['#include <gnuradio/gr_complex.h>'] = None
+        out.append('{' + str(pyval.real) + ', ' + str(pyval.imag) + '}')
+
+    elif pytype is list:
+        includes['#include <vector>'] = None
+        out.append('{')
+        for index, element in enumerate(pyval):
+            if index:
+                out.append(', ')
+            _write_cpp_value(element, out, includes)
+        out.append('}')
+
+    elif pytype is dict:
+        includes['#include <map>'] = None
+        out.append('{')
+        for index, (key, value) in enumerate(pyval.items()):
+            if index:
+                out.append(', ')
+            out.append('{')
+            _write_cpp_value(key, out, includes)
+            out.append(', ')
+            _write_cpp_value(value, out, includes)
+            out.append('}')
+        out.append('}')
+
+    else:
+        includes['#include <string>'] = None
+        out.append('"' + pyval + '"')
+
+
 class Block(Element):
 
     is_block = True
@@ -54,6 +136,9 @@ class Block(Element):
 
     extra_data = {}
     loaded_from = '(unknown)'
+    loaded_data = None  # the description the class was built from
+
+    _export_data = None  # cache of export_data(), dropped on changes
 
     def __init__(self, parent):
         """Make a new block from nested data."""
@@ -76,8 +161,8 @@ class Block(Element):
         self.active_sources = []  # on rewrite
         self.active_sinks = []  # on rewrite
 
-        self.states = {'state': True, 'bus_source': False,
-                       'bus_sink': False, 'bus_structure': None}
+        self.states = _States(self, {'state': True, 'bus_source': False,
+                                     'bus_sink': False, 'bus_structure': None})
         self.block_namespace = {}
         self.deprecated = self.is_deprecated()
 
@@ -431,26 +516,32 @@ class Block(Element):
 
         return [make_callback(c) for c in self.cpp_templates.render('callbacks')]
 
-    def format_expr(self, py_type):
+    def format_expr(self, py_type, evaluated=None):
         """
         Evaluate the value of the variable block and decide its type.
 
+        Args:
+            py_type: the python type of the value
+            evaluated: the already evaluated value (optional)
+
         Returns:
             None
         """
         value = self.params['value'].value
         self.cpp_templates = copy.copy(self.orig_cpp_templates)
+        # don't add includes to the list shared with the original templates
+        self.cpp_templates['includes'] = list(self.cpp_templates['includes'])
 
         # Determine the lvalue type
-        def get_type(element, _vtype):
-            evaluated = None
-            try:
-                evaluated = ast.literal_eval(element)
-                if _vtype == None:
-                    _vtype = type(evaluated)
-            except ValueError or SyntaxError as excp:
-                if _vtype == None:
-                    print(excp)
+        def get_type(element, _vtype, evaluated=None):
+            if evaluated is None:
+                try:
+                    evaluated = ast.literal_eval(element)
+                    if _vtype == None:
+                        _vtype = type(evaluated)
+                except ValueError or SyntaxError as excp:
+                    if _vtype == None:
+                        print(excp)
 
             if _vtype in [int, float, bool, list, dict, str, complex]:
                 if _vtype == (int or long):
@@ -476,22 +567,23 @@ class Block(Element):
                 if _vtype == dict:
                     try:
                         # For container types we must also determine the type of the template parameter(s)
-                        key = list(evaluated)[0]
-                        val = list(evaluated.values())[0]
+                        key = next(iter(evaluated))
+                        val = evaluated[key]
                         return 'std::map<' + get_type(str(key), type(key)) + ', ' + get_type(str(val), type(val)) + '>'
 
-                    except IndexError:  # empty dict
+                    except StopIteration:  # empty dict
                         return 'std::map<std::string, std::string>'
 
                 else:
                     return 'std::string'
 
         # Get the lvalue type
-        self.vtype = get_type(value, py_type)
+        self.vtype = get_type(value, py_type, evaluated)
 
         # The r-value for these types must be transformed to create legal C++ syntax.
         if self.vtype in ['bool', 'gr_complex'] or 'std::map' in self.vtype or 'std::vector' in self.vtype:
-            evaluated = ast.literal_eval(value)
+            if evaluated is None:
+                evaluated = ast.literal_eval(value)
             self.cpp_templates['var_make'] = self.cpp_templates['var_make'].replace(
                 '${value}', self.get_cpp_value(evaluated))
 
@@ -499,57 +591,16 @@ class Block(Element):
             self.cpp_templates['includes'].append('#include <string>')
 
     def get_cpp_value(self, pyval):
-
-        if type(pyval) == int or type(pyval) == float:
-            val_str = str(pyval)
-
-            # Check for PI and replace with C++ constant
-            pi_re = r'^(math|numpy|np|scipy|sp)\.pi$'
-            if re.match(pi_re, str(pyval)):
-                val_str = re.sub(
-                    pi_re, 'boost::math::constants::pi<double>()', val_str)
-                self.cpp_templates['includes'].append(
-                    '#include <boost/math/constants/constants.hpp>')
-
-            return str(pyval)
-
-        elif type(pyval) == bool:
-            return str(pyval)[0].lower() + str(pyval)[1:]
-
-        elif type(pyval) == complex:
-            self.cpp_templates['includes'].append(
-                '#include <gnuradio/gr_complex.h>')
-            evaluated = ast.literal_eval(str(pyval).strip())
-            return '{' + str(evaluated.real) + ', ' + str(evaluated.imag) + '}'
-
-        elif type(pyval) == list:
-            self.cpp_templates['includes'].append('#include <vector>')
-            val_str = '{'
-            for element in pyval:
-                val_str += self.get_cpp_value(element) + ', '
-
-            if len(val_str) > 1:
-                # truncate to trim superfluous ', ' from the end
-                val_str = val_str[0:-2]
-
-            return val_str + '}'
-
-        elif type(pyval) == dict:
-            self.cpp_templates['includes'].append('#include <map>')
-            val_str = '{'
-            for key in pyval:
-                val_str += '{' + self.get_cpp_value(key) + \
-                    ', ' + self.get_cpp_value(pyval[key]) + '}, '
-
-            if len(val_str) > 1:
-                # truncate to trim superfluous ', ' from the end
-                val_str = val_str[0:-2]
-
-            return val_str + '}'
-
-        if type(self.vtype) == str:
-            self.cpp_templates['includes'].append('#include <string>')
-            return '"' + pyval + '"'
+        """
+        Get the C++ literal of a python value.
+        The literal is collected in a list of pieces and joined once,
+        so large vectors (e.g. filter taps) are converted in linear time.
+        """
+        out = []
+        includes = collections.OrderedDict()
+        _write_cpp_value(pyval, out, includes)
+        self.cpp_templates['includes'].extend(includes)
+        return ''.join(out)
 
     def is_virtual_sink(self):
         return self.key == 'virtual_sink'
@@ -650,10 +701,15 @@ class Block(Element):
     def export_data(self):
         """
         Export this block's params to nested data.
+        The data is kept until a param value or state changes,
+        so it is shared between calls and must not be modified.
 
         Returns:
             a nested data odict
         """
+        if self._export_data is not None:
+            return self._export_data
+
         data = collections.OrderedDict()
         if self.key != 'options':
             data['name'] = self.name
@@ -663,6 +719,7 @@ class Block(Element):
             if (param_id != 'id' or self.key == 'options')
         ))
         data['states'] = collections.OrderedDict(sorted(self.states.items()))
+        self._export_data = data
         return data
 
     def import_data(self, name, states, parameters, **_):
@@ -142,6 +142,7 @@ class EPyBlock(Block):
 
     def _update_params(self, params_in_src):
         param_factory = self.parent_platform.make_param
+        self._export_data = None
         params = {}
         for key, value in self.params.copy().items():
             if hasattr(value, '__epy_param__'):
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: GPL-2.0-or-later
 #
 
+import hashlib
 import json
 import logging
 import os
@@ -97,3 +98,125 @@ class Cache(object):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.save()
+
+
+class HierBlockCache(object):
+    """
+    Records the source hash and the generated files of hier blocks built
+    from .grc files, so that hier blocks are only regenerated when their
+    sources or the sources of the hier blocks they use changed.
+    """
+
+    def __init__(self, filename):
+        self.cache_file = filename
+        self.entries = {}
+        self._loaded = False
+        self._hashes = {}
+
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.cache_file, encoding='utf-8') as cache_file:
+                self.entries = json.load(cache_file)
+        except (IOError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = '{}.{}.tmp'.format(self.cache_file, os.getpid())
+            with open(tmp_file, 'w', encoding='utf-8') as cache_file:
+                json.dump(self.entries, cache_file, indent=1)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            logger.warning('Could not write hier block cache %s', self.cache_file)
+
+    def file_hash(self, filename):
+        """Get the sha1 of a file, memoized by modification time and size"""
+        stat = os.stat(filename)
+        key = filename, stat.st_mtime_ns, stat.st_size
+        try:
+            return self._hashes[key]
+        except KeyError:
+            pass
+        with open(filename, 'rb') as fp:
+            digest = hashlib.sha1(fp.read()).hexdigest()
+        self._hashes[key] = digest
+        return digest
+
+    def get(self, source):
+        if not self._loaded:
+            self.load()
+        return self.entries.get(os.path.abspath(source))
+
+    def record(self, source, block_id, outputs, block_file, depends):
+        """
+        Record a freshly generated hier block.
+
+        Args:
+            source: the .grc file it was generated from
+            block_id: the id of the hier block
+            outputs: the generated files
+            block_file: the generated .block.yml
+            depends: the .grc sources of the hier blocks it uses
+        """
+        source = os.path.abspath(source)
+        self.load()  # merge with entries written by other processes
+        try:
+            depends = {
+                dep_source: self.file_hash(dep_source)
+                for dep_source in map(os.path.abspath, depends) if dep_source != source
+            }
+            self.entries[source] = {
+                'id': block_id,
+                'hash': self.file_hash(source),
+                'outputs': list(outputs),
+                'block_file': block_file,
+                'depends': depends,
+            }
+        except OSError:
+            self.entries.pop(source, None)
+        self.save()
+
+    def discard(self, source):
+        """Forget a hier block, so that it is regenerated next time"""
+        source = os.path.abspath(source)
+        self.load()
+        if self.entries.pop(source, None) is not None:
+            self.save()
+
+    def stale_dependencies(self, source):
+        """Get the sources of hier blocks used by source that need regeneration"""
+        entry = self.get(source)
+        if not entry:
+            return []
+        return [dep_source for dep_source in entry['depends']
+                if not self.is_up_to_date(dep_source)]
+
+    def is_up_to_date(self, source, _visited=None):
+        """Check the hier block generated from source and its dependencies"""
+        entry = self.get(source)
+        if not entry:
+            return False
+        visited = _visited if _visited is not None else set()
+        source = os.path.abspath(source)
+        if source in visited:
+            return True  # cycles are reported when loading
+        visited.add(source)
+
+        try:
+            if self.file_hash(source) != entry['hash']:
+                return False
+        except OSError:
+            return False
+        if not all(os.path.exists(path) for path in entry['outputs']):
+            return False
+        for dep_source, dep_hash in entry['depends'].items():
+            try:
+                if self.file_hash(dep_source) != dep_hash:
+                    return False
+            except OSError:
+                return False
+            if not self.is_up_to_date(dep_source, visited):
+                return False
+        return True
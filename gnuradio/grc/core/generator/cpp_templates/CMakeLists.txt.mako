@@ -22,6 +22,12 @@ set(CMAKE_CXX_STANDARD 14)
 
 project(${class_name})
 
+<%text># Use ccache for faster rebuilds, when available
+find_program(CCACHE_PROGRAM ccache)
+if(CCACHE_PROGRAM)
+    set(CMAKE_CXX_COMPILER_LAUNCHER "${CCACHE_PROGRAM}")
+endif()</%text>
+
 find_package(Gnuradio "${short_version}" COMPONENTS
     % for component in config.enabled_components.split(";"):
     % if component.startswith("gr-"):
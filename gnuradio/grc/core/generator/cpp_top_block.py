@@ -99,21 +99,34 @@ class CppTopBlockGenerator(object):
             os.makedirs(self.file_path)
 
         for filename, data in self._build_cpp_header_code_from_template():
-            with codecs.open(filename, 'w', encoding='utf-8') as fp:
-                fp.write(data)
+            self._write_if_changed(filename, data)
 
         if not self._generate_options.startswith('hb'):
             if not os.path.exists(os.path.join(self.file_path, 'build')):
                 os.makedirs(os.path.join(self.file_path, 'build'))
 
             for filename, data in self._build_cpp_source_code_from_template():
-                with codecs.open(filename, 'w', encoding='utf-8') as fp:
-                    fp.write(data)
+                self._write_if_changed(filename, data)
 
             if fg.get_option('gen_cmake') == 'On':
                 for filename, data in self._build_cmake_code_from_template():
-                    with codecs.open(filename, 'w', encoding='utf-8') as fp:
-                        fp.write(data)
+                    self._write_if_changed(filename, data)
+
+    @staticmethod
+    def _write_if_changed(filename, data):
+        """
+        Write data to filename, unless the file already has that content.
+        Keeping the modification time lets the build system skip
+        reconfiguring and recompiling unchanged flow graphs.
+        """
+        try:
+            with codecs.open(filename, 'r', encoding='utf-8') as fp:
+                if fp.read() == data:
+                    return
+        except (IOError, UnicodeDecodeError):
+            pass
+        with codecs.open(filename, 'w', encoding='utf-8') as fp:
+            fp.write(data)
 
     def _build_cpp_source_code_from_template(self):
         """
@@ -311,36 +324,47 @@ class CppTopBlockGenerator(object):
                 var.vtype = type_translation[var.params['value'].dtype]
                 variables.remove(var)
 
-        # If the type is 'raw', we'll need to evaluate the variable to infer the type.
+        # If the type is 'raw', the type is inferred from the value the flow graph
+        # already evaluated for its namespace (see FlowGraph.renew_namespace).
+        namespace = fg.namespace
+        var_ids = [str(var.params['id'].value) for var in variables]
+        if all(var_id in namespace for var_id in var_ids):
+            var_types = {var_id: type(namespace[var_id]) for var_id in var_ids}
+            values = namespace
+        else:
+            var_types = self._evaluate_variable_types(variables)
+            values = {}
+
+        # Format the rvalue of each variable expression
+        for var, var_id in zip(variables, var_ids):
+            var.format_expr(var_types[var_id], values.get(var_id))
+
+    def _evaluate_variable_types(self, variables):
         # Create an executable fragment of code containing all 'raw' variables in
         # order to infer the lvalue types.
         #
         # Note that this differs from using ast.literal_eval() as literal_eval evaluates one
         # variable at a time. The code fragment below evaluates all variables together which
         # allows the variables to reference each other (i.e. a = b * c).
-        prog = 'def get_decl_types():\n'
-        prog += '\tvar_types = {}\n'
+        prog = ['def get_decl_types():', '\tvar_types = {}']
         for var in variables:
-            prog += '\t' + str(var.params['id'].value) + \
-                '=' + str(var.params['value'].value) + '\n'
-        prog += '\tvar_types = {}\n'
+            prog.append('\t' + str(var.params['id'].value) +
+                        '=' + str(var.params['value'].value))
+        prog.append('\tvar_types = {}')
         for var in variables:
-            prog += '\tvar_types[\'' + str(var.params['id'].value) + \
-                '\'] = type(' + str(var.params['id'].value) + ')\n'
-        prog += '\treturn var_types'
+            prog.append('\tvar_types[\'' + str(var.params['id'].value) +
+                        '\'] = type(' + str(var.params['id'].value) + ')')
+        prog.append('\treturn var_types')
 
         # Execute the code fragment in a separate namespace and retrieve the lvalue types
         var_types = {}
         namespace = {}
         try:
-            exec(prog, namespace)
+            exec('\n'.join(prog), namespace)
             var_types = namespace['get_decl_types']()
         except Exception as excp:
             print('Failed to get parameter lvalue types: %s' % (excp))
-
-        # Format the rvalue of each variable expression
-        for var in variables:
-            var.format_expr(var_types[str(var.params['id'].value)])
+        return var_types
 
     def _parameter_types(self):
         fg = self._flow_graph
@@ -380,21 +404,21 @@ class CppTopBlockGenerator(object):
                     cb, replace_dict) for cb in block.get_cpp_callbacks())
 
         # Map var id to callbacks
-        def uses_var_id(callback):
-            used = expr_utils.get_variable_dependencies(callback, [var_id])
+        def uses_var_id(var_id, callback):
             # callback might contain var_id itself
-            return used and ('this->' + var_id in callback)
+            return 'this->' + var_id in callback
 
         callbacks = {}
+        users = expr_utils.get_variable_users(callbacks_all, var_ids)
         for var_id in var_ids:
             callbacks[var_id] = [
-                callback for callback in callbacks_all if uses_var_id(callback)]
+                callback for callback in users[var_id] if uses_var_id(var_id, callback)]
 
         return callbacks
 
     def _connections(self):
         fg = self._flow_graph
-        templates = {key: Template(text)
+        templates = {key: blocks.MakoTemplates.get_template(text, strict_undefined=False)
                      for key, text in fg.parent_platform.cpp_connection_templates.items()}
 
         def make_port_sig(port):
@@ -230,21 +230,21 @@ class TopBlockGenerator(object):
                 cb, replace_dict) for cb in block.get_callbacks())
 
         # Map var id to callbacks
-        def uses_var_id(callback):
-            used = expr_utils.get_variable_dependencies(callback, [var_id])
+        def uses_var_id(var_id, callback):
             # callback might contain var_id itself
-            return used and (('self.' + var_id in callback) or ('this->' + var_id in callback))
+            return ('self.' + var_id in callback) or ('this->' + var_id in callback)
 
         callbacks = {}
+        users = expr_utils.get_variable_users(callbacks_all, var_ids)
         for var_id in var_ids:
             callbacks[var_id] = [
-                callback for callback in callbacks_all if uses_var_id(callback)]
+                callback for callback in users[var_id] if uses_var_id(var_id, callback)]
 
         return callbacks
 
     def _connections(self):
         fg = self._flow_graph
-        templates = {key: Template(text)
+        templates = {key: blocks.MakoTemplates.get_template(text, strict_undefined=False)
                      for key, text in fg.parent_platform.connection_templates.items()}
 
         def make_port_sig(port):
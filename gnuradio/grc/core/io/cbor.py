@@ -0,0 +1,176 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Compact binary encoding of nested flow graph data.
+
+A subset of CBOR (RFC 8949) covering the types found in exported flow graph
+data: dicts, lists, tuples, str, int, float, bool and None. Mappings keep
+their order. Tuples are read back as lists.
+"""
+
+import struct
+
+# self-described CBOR, marks the start of a file
+MAGIC = b'\xd9\xd9\xf7'
+
+_UINT, _NINT, _BYTES, _TEXT, _ARRAY, _MAP, _TAG, _SIMPLE = range(8)
+
+_FALSE, _TRUE, _NULL = b'\xf4', b'\xf5', b'\xf6'
+_FLOAT64 = 0xfb
+
+_pack_float = struct.Struct('>d').pack
+_unpack_float = struct.Struct('>d').unpack_from
+_UNSIGNED = {
+    24: struct.Struct('>B'),
+    25: struct.Struct('>H'),
+    26: struct.Struct('>I'),
+    27: struct.Struct('>Q'),
+}
+
+
+class DecodeError(ValueError):
+    pass
+
+
+def _head(major, value):
+    major <<= 5
+    if value < 24:
+        return bytes((major | value,))
+    if value < 0x100:
+        return bytes((major | 24, value))
+    if value < 0x10000:
+        return bytes((major | 25,)) + value.to_bytes(2, 'big')
+    if value < 0x100000000:
+        return bytes((major | 26,)) + value.to_bytes(4, 'big')
+    if value < 0x10000000000000000:
+        return bytes((major | 27,)) + value.to_bytes(8, 'big')
+    raise ValueError('Integer {} out of range'.format(value))
+
+
+def _encode(value, out):
+    value_type = type(value)
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        out.append(_head(_TEXT, len(data)))
+        out.append(data)
+    elif value is None:
+        out.append(_NULL)
+    elif value_type is bool:
+        out.append(_TRUE if value else _FALSE)
+    elif value_type is int:
+        out.append(_head(_UINT, value) if value >= 0 else _head(_NINT, -1 - value))
+    elif value_type is float:
+        out.append(bytes((_FLOAT64,)) + _pack_float(value))
+    elif isinstance(value, dict):
+        out.append(_head(_MAP, len(value)))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, (list, tuple)):
+        out.append(_head(_ARRAY, len(value)))
+        for item in value:
+            _encode(item, out)
+    else:
+        raise TypeError('Can not encode {!r}'.format(type(value).__name__))
+
+
+def dumps(data):
+    """
+    Encode nested data.
+
+    Args:
+        data: the nested data
+
+    Returns:
+        the encoded bytes, starting with the magic
+    """
+    out = [MAGIC]
+    _encode(data, out)
+    return b''.join(out)
+
+
+class _Decoder(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size):
+        """Skip the next size bytes and get the position they start at"""
+        start = self.pos
+        if start + size > len(self.data):
+            raise DecodeError('Unexpected end of data')
+        self.pos += size
+        return start
+
+    def argument(self, info):
+        if info < 24:
+            return info
+        try:
+            fmt = _UNSIGNED[info]
+        except KeyError:
+            raise DecodeError('Unsupported length {} at {}'.format(info, self.pos))
+        value, = fmt.unpack_from(self.data, self.take(fmt.size))
+        return value
+
+    def decode(self):
+        data = self.data
+        try:
+            initial = data[self.pos]
+        except IndexError:
+            raise DecodeError('Unexpected end of data')
+        self.pos += 1
+        major, info = initial >> 5, initial & 0x1f
+
+        if major == _TEXT:
+            start = self.take(self.argument(info))
+            return data[start:self.pos].decode('utf-8')
+        if major == _MAP:
+            result = {}
+            for _ in range(self.argument(info)):
+                key = self.decode()
+                result[key] = self.decode()
+            return result
+        if major == _ARRAY:
+            return [self.decode() for _ in range(self.argument(info))]
+        if major == _UINT:
+            return self.argument(info)
+        if major == _NINT:
+            return -1 - self.argument(info)
+        if major == _SIMPLE:
+            if info == 20:
+                return False
+            if info == 21:
+                return True
+            if info == 22:
+                return None
+            if initial == _FLOAT64:
+                value, = _unpack_float(data, self.take(8))
+                return value
+        if major == _BYTES:
+            start = self.take(self.argument(info))
+            return data[start:self.pos]
+        raise DecodeError('Unsupported item 0x{:02x} at {}'.format(initial, self.pos - 1))
+
+
+def loads(data):
+    """
+    Decode nested data.
+
+    Args:
+        data: bytes as returned by dumps()
+
+    Returns:
+        the nested data
+    """
+    if not data.startswith(MAGIC):
+        raise DecodeError('Not a binary flow graph')
+    decoder = _Decoder(data)
+    decoder.pos = len(MAGIC)
+    result = decoder.decode()
+    if decoder.pos != len(data):
+        raise DecodeError('Trailing data at {}'.format(decoder.pos))
+    return result
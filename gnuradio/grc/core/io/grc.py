@@ -0,0 +1,320 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""
+Streaming reader and writer for .grc files.
+
+The structure of a flow graph file is fixed, so it is written directly to
+the stream. Simple scalars are written plain or single-quoted, the way the
+YAML emitter would do it. All other values are passed through the dumper
+in an equivalent context, so the output is the same as that of yaml.dump().
+"""
+
+from collections import OrderedDict, deque
+from collections.abc import Iterator, Mapping
+import functools
+import re
+
+import yaml as pyyaml
+
+from . import yaml
+
+# strings that are never folded nor need escaping ('...' ends a document)
+_SIMPLE_SCALAR = re.compile(r'(?!\.\.\.)[A-Za-z0-9_.]+\Z')
+_resolver = pyyaml.resolver.Resolver()
+_BEST_WIDTH = 80
+
+_TOP_LEVEL_KEYS = ('options', 'blocks', 'connections', 'metadata')
+_BLOCK_KEYS = ('name', 'id', 'parameters', 'states')
+_OPTIONS_KEYS = ('parameters', 'states')
+
+
+@functools.lru_cache(maxsize=65536)
+def _simple_scalar(value):
+    """Get the representation of a simple string (None if not simple)"""
+    if not _SIMPLE_SCALAR.match(value):
+        return None
+    tag = _resolver.resolve(pyyaml.ScalarNode, value, (True, False))
+    if tag == 'tag:yaml.org,2002:str':
+        return value
+    # would be read as a number, bool or null
+    return "'" + value + "'"
+
+
+def _scalar(value):
+    """Get the representation of a simple value (None if not simple)"""
+    if type(value) is bool:
+        return 'true' if value else 'false'
+    if type(value) is int:
+        return str(value)
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return _simple_scalar(str(value))
+    return None
+
+
+def _dump(data):
+    return yaml.dump(data, indent=2)
+
+
+def _dump_entry(key, value, depth):
+    """Dump a key/value pair of a mapping nested depth levels deep"""
+    try:
+        return _dump_hashable_entry(key, value, depth)
+    except TypeError:  # unhashable value, don't cache
+        return _dump_hashable_entry.__wrapped__(key, value, depth)
+
+
+@functools.lru_cache(maxsize=4096)
+def _dump_hashable_entry(key, value, depth):
+    data = OrderedDict([(key, value)])
+    for _ in range(depth):
+        data = {'_': data}
+    return _dump(data).split('\n', depth)[depth]
+
+
+def _items(mapping):
+    """Items of a mapping in the order the dumper writes them"""
+    if isinstance(mapping, OrderedDict):
+        return mapping.items()
+    try:
+        return sorted(mapping.items())
+    except TypeError:
+        return mapping.items()
+
+
+def _write_mapping(write, mapping, depth, flowing=()):
+    indent = '  ' * depth
+    for key, value in _items(mapping):
+        key_repr = _scalar(key) if isinstance(key, str) else None
+        value_repr = _scalar(value)
+        if key_repr is not None and value_repr is not None:
+            write(indent + key_repr + ': ' + value_repr + '\n')
+        elif key in flowing and _is_short_int_list(value):
+            write(indent + key_repr + ': [' + ', '.join(map(str, value)) + ']\n')
+        else:
+            if key in flowing:
+                value = yaml.ListFlowing(value)
+            write(_dump_entry(key, value, depth))
+
+
+def _is_short_int_list(value):
+    return (isinstance(value, (list, tuple)) and len(value) <= 4 and
+            all(type(v) is int for v in value))
+
+
+def _write_block(write, block):
+    if (not isinstance(block, OrderedDict) or tuple(block) != _BLOCK_KEYS or
+            not block['parameters'] or not block['states']):
+        # uncommon layout, let the dumper handle the whole block
+        write(_dump([_with_flowing_coordinate(block)]))
+        return
+
+    name = _scalar(block['name'])
+    key = _scalar(block['id'])
+    write('- name: ' + name + '\n' if name is not None else _dump([{'name': block['name']}]))
+    write('  id: ' + key + '\n' if key is not None else _dump_entry('id', block['id'], 1))
+    _write_parameters_and_states(write, block)
+
+
+def _write_parameters_and_states(write, block):
+    write('  parameters:\n')
+    _write_mapping(write, block['parameters'], 2)
+    write('  states:\n')
+    _write_mapping(write, block['states'], 2, flowing=('coordinate',))
+
+
+def _with_flowing_coordinate(block):
+    try:
+        block = block.copy()
+        states = block['states'] = block['states'].copy()
+        states['coordinate'] = yaml.ListFlowing(states['coordinate'])
+    except (KeyError, TypeError, AttributeError):
+        pass
+    return block
+
+
+def _write_connection(write, connection):
+    items = [_simple_scalar(str(item)) if isinstance(item, str) else None
+             for item in connection]
+    line = '- [' + ', '.join(item or '' for item in items) + ']\n'
+    if None in items or len(line) > _BEST_WIDTH:
+        # might need escaping or wrapping
+        line = _dump([yaml.ListFlowing(connection)])
+    write(line)
+
+
+def _write_section(write, key, data, write_content):
+    if data:
+        write('\n' + key + ':\n')
+        write_content()
+    else:
+        write(_dump({key: data}))
+
+
+def dump(data, stream):
+    """
+    Write exported flow graph data in the .grc format.
+
+    Args:
+        data: the nested data as returned by FlowGraph.export_data()
+        stream: a writable text stream
+    """
+    write = stream.write
+    if (not isinstance(data, OrderedDict) or
+            tuple(data) != tuple(k for k in _TOP_LEVEL_KEYS if k in data)):
+        write(dump_document(data))
+        return
+
+    if 'options' in data:
+        options = data['options']
+        if (isinstance(options, OrderedDict) and tuple(options) == _OPTIONS_KEYS and
+                options['parameters'] and options['states']):
+            write('options:\n')
+            _write_parameters_and_states(write, options)
+        else:
+            write(_dump({'options': _with_flowing_coordinate(options)}))
+
+    def write_blocks():
+        for block in data['blocks']:
+            _write_block(write, block)
+
+    def write_connections():
+        for connection in data['connections']:
+            _write_connection(write, connection)
+
+    def write_metadata():
+        _write_mapping(write, data['metadata'], 1)
+
+    for key, write_content in (('blocks', write_blocks),
+                               ('connections', write_connections),
+                               ('metadata', write_metadata)):
+        if key in data:
+            _write_section(write, key, data[key], write_content)
+
+
+def dump_document(data):
+    """Dump exported flow graph data in one go (reference implementation)"""
+    data = data.copy()
+    try:
+        data['connections'] = [yaml.ListFlowing(i) for i in data['connections']]
+    except KeyError:
+        pass
+
+    try:
+        data['options'] = _with_flowing_coordinate(data['options'])
+        data['blocks'] = [_with_flowing_coordinate(d) for d in data['blocks']]
+    except KeyError:
+        pass
+
+    out = yaml.dump(data, indent=2)
+
+    replace = [
+        ('blocks:\n', '\nblocks:\n'),
+        ('connections:\n', '\nconnections:\n'),
+        ('metadata:\n', '\nmetadata:\n'),
+    ]
+    for r in replace:
+        out = out.replace(*r)
+    return out
+
+
+class StreamedData(Mapping):
+    """
+    Flow graph data, parsed from a .grc file while it is being used.
+
+    The top-level sections are parsed as they are accessed. The 'blocks'
+    section is an iterator, which yields each block right after it has been
+    parsed. Sections following it are available once it is exhausted;
+    accessing them earlier buffers the remaining blocks. They are read all
+    at once, then the stream is closed.
+    """
+
+    def __init__(self, stream, validator=None):
+        """
+        Args:
+            stream: the contents of a .grc file or a readable stream
+            validator: an optional schema checker run on each block
+        """
+        self._stream = stream
+        self._entries = yaml.iter_mapping(stream, sequence_keys=('blocks',))
+        self._validator = validator
+        self._data = OrderedDict()
+        self._blocks = None  # the blocks still being parsed
+        self._buffered = deque()
+        self._listeners = []
+        self._done = False
+
+    def add_block_listener(self, listener):
+        """
+        Call a function with the data of each block when it is read,
+        then with None when there are no more blocks.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, block_data):
+        for listener in self._listeners:
+            listener(block_data)
+        if block_data is None:
+            del self._listeners[:]
+
+    def _read_entry(self):
+        if self._blocks is not None:
+            # don't lose the remaining blocks by advancing the parser
+            self._buffered.extend(self._blocks)
+            self._blocks = None
+        for key, value in self._entries:
+            if key == 'blocks' and isinstance(value, Iterator):
+                self._blocks = value
+                self._data[key] = self._iter_blocks()
+                return
+            self._data[key] = value
+            if 'blocks' not in self._data:
+                return
+            # the sections after the blocks are small, read to the end
+        self.close()
+
+    def close(self):
+        """Stop parsing and close the stream (if it was given a stream)"""
+        self._done = True
+        self._blocks = None
+        self._notify(None)
+        self._entries.close()
+        if hasattr(self._stream, 'close'):
+            self._stream.close()
+
+    def _iter_blocks(self):
+        while self._buffered or self._blocks is not None:
+            if self._buffered:
+                block_data = self._buffered.popleft()
+            else:
+                try:
+                    block_data = next(self._blocks)
+                except StopIteration:
+                    self._blocks = None
+                    continue
+            if self._validator:
+                self._validator.run(block_data)
+            self._notify(block_data)
+            yield block_data
+        self._notify(None)
+
+    def _read_all(self):
+        while not self._done:
+            self._read_entry()
+
+    def __getitem__(self, key):
+        while key not in self._data and not self._done:
+            self._read_entry()
+        return self._data[key]
+
+    def __iter__(self):
+        self._read_all()
+        return iter(self._data)
+
+    def __len__(self):
+        self._read_all()
+        return len(self._data)
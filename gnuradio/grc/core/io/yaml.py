@@ -80,5 +80,109 @@ def dump(data, stream=None, **kwargs):
     return yaml.dump_all([data], **config)
 
 
-safe_load = yaml.safe_load
+# the libyaml based loader is several times faster
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def safe_load(stream):
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def iter_mapping(stream, sequence_keys=()):
+    """
+    Load a document with a top-level mapping entry by entry.
+
+    Values of the keys in sequence_keys are not loaded as a whole. Instead,
+    an iterator is returned, which loads the items of the sequence one by one.
+    Like with itertools.groupby(), it has to be consumed before advancing
+    to the next entry, remaining items are skipped.
+
+    Args:
+        stream: a string or a readable stream
+        sequence_keys: keys of the sequences to load item by item
+
+    Returns:
+        a generator of (key, value) tuples
+    """
+    loader = SafeLoader(stream)
+    try:
+        loader.get_event()  # StreamStart
+        if loader.check_event(yaml.StreamEndEvent):
+            return  # empty document
+        loader.get_event()  # DocumentStart
+        if not loader.check_event(yaml.MappingStartEvent):
+            raise yaml.YAMLError('Expected a mapping at the top level')
+        loader.get_event()
+
+        anchors = {}
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.construct_document(_compose(loader, anchors))
+            if key in sequence_keys and loader.check_event(yaml.SequenceStartEvent):
+                loader.get_event()
+                items = _iter_sequence(loader, anchors)
+                yield key, items
+                for _ in items:
+                    pass  # skip the rest
+            else:
+                yield key, loader.construct_document(_compose(loader, anchors))
+    finally:
+        loader.dispose()
+
+
+def _iter_sequence(loader, anchors):
+    while not loader.check_event(yaml.SequenceEndEvent):
+        yield loader.construct_document(_compose(loader, anchors))
+    loader.get_event()
+
+
+def _compose(loader, anchors):
+    """Build the node of the next value from the parser events"""
+    event = loader.get_event()
+    if isinstance(event, yaml.AliasEvent):
+        try:
+            return anchors[event.anchor]
+        except KeyError:
+            raise yaml.composer.ComposerError(
+                None, None, 'found undefined alias {!r}'.format(event.anchor),
+                event.start_mark)
+
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        node = yaml.ScalarNode(tag, event.value, event.start_mark,
+                               event.end_mark, style=event.style)
+
+    elif isinstance(event, yaml.SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.SequenceNode, None, event.implicit)
+        node = yaml.SequenceNode(tag, [], event.start_mark, None,
+                                 flow_style=event.flow_style)
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node.value.append(_compose(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+
+    elif isinstance(event, yaml.MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.MappingNode, None, event.implicit)
+        node = yaml.MappingNode(tag, [], event.start_mark, None,
+                                flow_style=event.flow_style)
+        while not loader.check_event(yaml.MappingEndEvent):
+            item_key = _compose(loader, anchors)
+            item_value = _compose(loader, anchors)
+            node.value.append((item_key, item_value))
+        node.end_mark = loader.get_event().end_mark
+
+    else:
+        raise yaml.composer.ComposerError(
+            None, None, 'unexpected {}'.format(type(event).__name__),
+            event.start_mark)
+
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
 __with_libyaml__ = yaml.__with_libyaml__
@@ -116,6 +116,16 @@ class Param(Element):
     def is_enum(self):
         return self.get_raw('dtype') == 'enum'
 
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        # drop the exported data of the block
+        self.parent_block._export_data = None
+
     def get_value(self):
         value = self.value
         if self.is_enum() and value not in self.options:
@@ -7,10 +7,12 @@
 
 from codecs import open
 from collections import namedtuple
+import itertools
 import os
 import logging
-from itertools import chain
+import queue
 import re
+import shutil
 
 from . import (
     Messages, Constants,
@@ -18,9 +20,9 @@ from . import (
 )
 
 from .Config import Config
-from .cache import Cache
+from .cache import Cache, HierBlockCache
 from .base import Element
-from .io import yaml
+from .io import cbor, grc, yaml
 from .generator import Generator
 from .FlowGraph import FlowGraph
 from .Connection import Connection
@@ -51,6 +53,11 @@ class Platform(Element):
 
         self._block_categories = {}
         self._auto_hier_block_generate_chain = set()
+        self.hier_block_cache = HierBlockCache(os.path.join(
+            self.config.hier_block_lib_dir, Constants.HIER_BLOCK_CACHE_FILE_NAME))
+
+        blocks.MakoTemplates.set_module_directory(
+            self.config.template_cache_dir)
 
         if not yaml.__with_libyaml__:
             logger.warning("Slow YAML loading (libyaml not available)")
@@ -81,12 +88,16 @@ class Platform(Element):
         if file_path in self._auto_hier_block_generate_chain:
             Messages.send('    >>> Warning: cyclic hier_block dependency\n')
             return None, None
+        if hier_only:
+            output_path = self._load_up_to_date_hier_block(file_path)
+            if output_path:
+                return None, output_path
         self._auto_hier_block_generate_chain.add(file_path)
         try:
             flow_graph = self.make_flow_graph()
             flow_graph.grc_file_path = file_path
             # Other, nested hier_blocks might be auto-loaded here
-            flow_graph.import_data(self.parse_flow_graph(file_path))
+            self.import_flow_graph(flow_graph, file_path)
             flow_graph.rewrite()
             flow_graph.validate()
             if not flow_graph.is_valid():
@@ -113,8 +124,72 @@ class Platform(Element):
                 '>>> Generate Error: {}: {}\n'.format(file_path, str(e)))
             return None, None
 
+        if flow_graph.get_option('generate_options').startswith('hb'):
+            self.load_generated_block(generator.file_path_yml)
+            depends = self._hier_block_sources(flow_graph)
+            if depends is None:
+                # can't tell when it needs regenerating
+                self.hier_block_cache.discard(file_path)
+            else:
+                self.hier_block_cache.record(
+                    file_path, flow_graph.get_option('id'),
+                    outputs=[generator.file_path, generator.file_path_yml],
+                    block_file=generator.file_path_yml,
+                    depends=depends
+                )
+
         return flow_graph, generator.file_path
 
+    def _hier_block_sources(self, flow_graph):
+        """
+        Get the .grc sources of the hier blocks used in a flow graph.
+
+        Returns:
+            a set of paths or None, if the source of a hier block is unknown
+        """
+        hier_block_lib_dir = os.path.abspath(self.config.hier_block_lib_dir)
+        sources = set()
+        for block in flow_graph.blocks:
+            grc_source = block.extra_data.get('grc_source')
+            if grc_source:
+                if not os.path.exists(grc_source):
+                    return None
+                sources.add(os.path.abspath(grc_source))
+            elif os.path.dirname(os.path.abspath(block.loaded_from)) == hier_block_lib_dir:
+                return None  # generated without recording its source
+        return sources
+
+    def _load_up_to_date_hier_block(self, file_path):
+        """
+        Load a hier block without regenerating it, if neither its source
+        nor the sources of the hier blocks it uses changed.
+        Stale hier blocks it depends on are regenerated first.
+
+        Returns:
+            the path of the generated hier block or None
+        """
+        cache = self.hier_block_cache
+        for dep_source in cache.stale_dependencies(file_path):
+            self.load_and_generate_flow_graph(dep_source, hier_only=True)
+        if not cache.is_up_to_date(file_path):
+            return None
+
+        entry = cache.get(file_path)
+        block_cls = self.blocks.get(entry['id'])
+        if block_cls is None or block_cls.loaded_from != entry['block_file']:
+            self.load_generated_block(entry['block_file'])
+        Messages.send('>>> Up to date: {}\n'.format(entry['outputs'][0]))
+        return entry['outputs'][0]
+
+    def load_generated_block(self, file_path):
+        """Load the description of a generated hier block into the library"""
+        with open(file_path, encoding='utf-8') as fp:
+            data = yaml.safe_load(fp)
+        block_cls = self.blocks.get(str(data.get('id', '')).rstrip('_'))
+        if block_cls is not None and block_cls.loaded_from == file_path:
+            del self.blocks[block_cls.key]  # reloading, don't warn about overwriting
+        self.load_block_description(data, file_path)
+
     def build_library(self, path=None):
         """load the blocks and block tree from the search paths
 
@@ -175,6 +250,7 @@ class Platform(Element):
             block.category = category
 
         self._docstring_extractor.finish()
+        logger.debug('Template cache: %s', blocks.MakoTemplates.cache_stats())
         # self._docstring_extractor.wait()
         if 'options' not in self.blocks:
             # we didn't find one of the built-in blocks ("options")
@@ -241,6 +317,7 @@ class Platform(Element):
         try:
             block_cls = self.blocks[block_id] = self.new_block_class(**data)
             block_cls.loaded_from = file_path
+            block_cls.loaded_data = data
         except errors.BlockLoadError as error:
             log.error('Unable to load block %s', block_id)
             log.exception(error)
@@ -283,6 +360,16 @@ class Platform(Element):
                 'connect', '')
             self.cpp_connection_templates[connection_id] = connection.get(
                 'cpp_connect', '')
+            # compile once here, the generators fetch them from the shared cache
+            # (not strict, like connection templates always were)
+            try:
+                blocks.MakoTemplates.compile(
+                    self.connection_templates[connection_id], strict_undefined=False)
+                blocks.MakoTemplates.compile(
+                    self.cpp_connection_templates[connection_id], strict_undefined=False)
+            except errors.TemplateError as error:
+                log.warning('Invalid connection template in %s: %s',
+                            file_path, error)
 
     def load_category_tree_description(self, data, file_path):
         """Parse category tree file and add it to list"""
@@ -315,29 +402,41 @@ class Platform(Element):
     ##############################################
     # Access
     ##############################################
-    def parse_flow_graph(self, filename):
+    def parse_flow_graph(self, filename, stream_blocks=False):
         """
         Parse a saved flow graph file.
         Ensure that the file exists, and passes the dtd check.
 
         Args:
             filename: the flow graph file
+            stream_blocks: parse the blocks while they are imported
 
         Returns:
             nested data
         @throws exception if the validation fails
         """
         filename = filename or self.config.default_flow_graph
-        is_xml = False
+        if filename.endswith(Constants.BINARY_FLOW_GRAPH_FILE_EXTENSION):
+            with open(filename, 'rb') as fp:
+                data = cbor.loads(fp.read())
+            validator = schema_checker.Validator(
+                schema_checker.FLOW_GRAPH_SCHEME)
+            validator.run(data)
+            return data
+
         with open(filename, encoding='utf-8') as fp:
             is_xml = '<flow_graph>' in fp.read(100)
-            fp.seek(0)
-            # todo: try
-            if not is_xml:
+        # todo: try
+        if not is_xml and stream_blocks:
+            # parsed from the file while it is imported, closed when all is read
+            return grc.StreamedData(open(filename, encoding='utf-8'), schema_checker.Validator(
+                schema_checker.FLOW_GRAPH_BLOCK_SCHEME))
+        elif not is_xml:
+            with open(filename, encoding='utf-8') as fp:
                 data = yaml.safe_load(fp)
-                validator = schema_checker.Validator(
-                    schema_checker.FLOW_GRAPH_SCHEME)
-                validator.run(data)
+            validator = schema_checker.Validator(
+                schema_checker.FLOW_GRAPH_SCHEME)
+            validator.run(data)
 
         if is_xml:
             Messages.send('>>> Converting from XML\n')
@@ -346,34 +445,81 @@ class Platform(Element):
 
         return data
 
-    def save_flow_graph(self, filename, flow_graph):
-        data = flow_graph.export_data()
+    def prewarm_templates(self, data):
+        """
+        Compile the templates of all blocks used in the flow graph data
+        in a background thread. Streamed data is picked up block by block,
+        while it is imported.
 
-        try:
-            data['connections'] = [yaml.ListFlowing(
-                i) for i in data['connections']]
-        except KeyError:
-            pass
+        Args:
+            data: the nested data odict as returned by parse_flow_graph
 
-        try:
-            for d in chain([data['options']], data['blocks']):
-                d['states']['coordinate'] = yaml.ListFlowing(
-                    d['states']['coordinate'])
-        except KeyError:
-            pass
+        Returns:
+            the started thread
+        """
+        if isinstance(data, grc.StreamedData):
+            pending = queue.Queue()
+            data.add_block_listener(pending.put)
+            blocks_data = iter(pending.get, None)
+        else:
+            blocks_data = data.get('blocks', [])
 
-        out = yaml.dump(data, indent=2)
+        def iter_texts():
+            seen = set()
+            for block_id in itertools.chain(['options'], (
+                    block_data.get('id') for block_data in blocks_data)):
+                if block_id in seen:
+                    continue
+                seen.add(block_id)
+                block_cls = self.block_classes.get(block_id)
+                if block_cls is None:
+                    continue
+                for templates in (block_cls.templates, getattr(block_cls, 'cpp_templates', None)):
+                    if templates:
+                        yield from templates.texts()
 
-        replace = [
-            ('blocks:\n', '\nblocks:\n'),
-            ('connections:\n', '\nconnections:\n'),
-            ('metadata:\n', '\nmetadata:\n'),
-        ]
-        for r in replace:
-            out = out.replace(*r)
+        return blocks.MakoTemplates.prewarm(iter_texts())
 
-        with open(filename, 'w', encoding='utf-8') as fp:
-            fp.write(out)
+    def import_flow_graph(self, flow_graph, filename):
+        """
+        Import a flow graph file, parsing the blocks while they are imported.
+        Their templates are compiled meanwhile in a background thread.
+
+        Args:
+            flow_graph: the flow graph to import into
+            filename: the flow graph file
+
+        Returns:
+            True if some connections could not be made
+        """
+        data = self.parse_flow_graph(filename, stream_blocks=True)
+        self.prewarm_templates(data)
+        try:
+            return flow_graph.import_data(data)
+        finally:
+            if isinstance(data, grc.StreamedData):
+                data.close()
+
+    def save_flow_graph(self, filename, flow_graph):
+        data = flow_graph.export_data()
+
+        # write to a temporary file first, so a failure won't leave a broken file
+        # (next to the file a symlink points to, which is replaced instead of the link)
+        filename = os.path.realpath(filename)
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+        try:
+            if filename.endswith(Constants.BINARY_FLOW_GRAPH_FILE_EXTENSION):
+                with open(tmp_filename, 'wb') as fp:
+                    fp.write(cbor.dumps(data))
+            else:
+                with open(tmp_filename, 'w', encoding='utf-8') as fp:
+                    grc.dump(data, fp)
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmp_filename)  # keep the permissions
+            os.replace(tmp_filename, filename)
+        finally:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
 
     def get_generate_options(self):
         for param in self.block_classes['options'].parameters_data:
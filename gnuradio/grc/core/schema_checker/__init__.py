@@ -2,4 +2,7 @@ from .validator import Validator
 
 from .block import BLOCK_SCHEME
 from .domain import DOMAIN_SCHEME
-from .flow_graph import FLOW_GRAPH_SCHEME
+from .flow_graph import FLOW_GRAPH_SCHEME, BLOCK_SCHEME as FLOW_GRAPH_BLOCK_SCHEME
+
+__all__ = ['Validator', 'BLOCK_SCHEME', 'DOMAIN_SCHEME',
+           'FLOW_GRAPH_SCHEME', 'FLOW_GRAPH_BLOCK_SCHEME']
@@ -24,7 +24,7 @@ def expr_replace(expr, replace_dict):
     """
     expr_splits = _expr_split(expr, var_chars=VAR_CHARS + '.')
     for i, es in enumerate(expr_splits):
-        if es in list(replace_dict.keys()):
+        if es in replace_dict:
             expr_splits[i] = replace_dict[es]
     return ''.join(expr_splits)
 
@@ -40,10 +40,30 @@ def get_variable_dependencies(expr, vars):
     Returns:
         a subset of vars used in the expression
     """
-    expr_toks = _expr_split(expr)
+    expr_toks = set(_expr_split(expr))
     return set(v for v in vars if v in expr_toks)
 
 
+def get_variable_users(exprs, vars):
+    """
+    Map each variable to the expressions it is used in.
+    Each expression is tokenized only once.
+
+    Args:
+        exprs: a list of expression strings
+        vars: a list of variable names
+
+    Returns:
+        a dict of variable name to the list of expressions using it
+    """
+    users = {v: [] for v in vars}
+    for expr in exprs:
+        for tok in set(_expr_split(expr)):
+            if tok in users:
+                users[tok].append(expr)
+    return users
+
+
 def sort_objects(objects, get_id, get_expr):
     """
     Sort a list of objects according to their expressions.
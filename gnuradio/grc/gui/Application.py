@@ -10,12 +10,14 @@ SPDX-License-Identifier: GPL-2.0-or-later
 import logging
 import os
 import subprocess
+import time
 
 from gi.repository import Gtk, Gio, GLib, GObject
 from getpass import getuser
 
 from . import Constants, Dialogs, Actions, Executor, FileDialogs, Utils, Bars
 
+from .Autosave import Autosave
 from .MainWindow import MainWindow
 # from .ParserErrorsDialog import ParserErrorsDialog
 from .PropsDialog import PropsDialog
@@ -99,6 +101,35 @@ class Application(Gtk.Application):
         Actions.APPLICATION_QUIT()
         return True
 
+    def _recover_flow_graphs(self):
+        """
+        Offer to open the flow graphs autosaved by an instance which did not quit normally.
+        """
+        recovered = self.autosave.find_recovery_files()
+        if not recovered:
+            return
+        main = self.main_window
+        names = '\n'.join(
+            '{} ({})'.format(Utils.encode(file_path or Constants.NEW_FLOGRAPH_TITLE),
+                             time.strftime('%c', time.localtime(mtime)))
+            for _, file_path, mtime in recovered)
+        response = Dialogs.MessageDialogWrapper(
+            main, Gtk.MessageType.QUESTION, Gtk.ButtonsType.YES_NO,
+            title='Recover Unsaved Flow Graphs',
+            markup='GRC did not quit normally. Open the unsaved changes of these flow graphs?'
+                   '\n\n' + names,
+        ).run_and_destroy()
+
+        for recovery_path, file_path, _ in recovered:
+            if response == Gtk.ResponseType.YES:
+                main.new_page(recovery_path, show=True)
+                page = main.current_page
+                if page and page.file_path == recovery_path:
+                    page.file_path = file_path
+                    page.flow_graph.grc_file_path = file_path
+                    page.saved = False
+            self.autosave.remove_recovery_file(recovery_path)
+
     def _handle_action(self, action, *args):
         log.debug("_handle_action({0}, {1})".format(action, args))
         main = self.main_window
@@ -119,6 +150,9 @@ class Application(Gtk.Application):
                 if os.path.exists(file_path):
                     main.new_page(
                         file_path, show=file_path_to_show == file_path)
+            self.autosave = Autosave(
+                main, self.config.recovery_dir, self.config.autosave_interval)
+            self._recover_flow_graphs()
             if not main.current_page:
                 main.new_page()  # ensure that at least a blank page exists
 
@@ -207,6 +241,7 @@ class Application(Gtk.Application):
             self.init = True
         elif action == Actions.APPLICATION_QUIT:
             if main.close_pages():
+                self.autosave.discard_all()
                 while Gtk.main_level():
                     Gtk.main_quit()
                 exit(0)
@@ -390,13 +425,11 @@ class Application(Gtk.Application):
                 page.state_cache.save_new_state(flow_graph.export_data())
                 page.saved = False
         elif action == Actions.BLOCK_ROTATE_CCW:
-            if flow_graph.rotate_selected(90):
-                flow_graph_update()
+            if flow_graph.rotate_selected(90):  # updates the shapes of the rotated blocks
                 page.state_cache.save_new_state(flow_graph.export_data())
                 page.saved = False
         elif action == Actions.BLOCK_ROTATE_CW:
-            if flow_graph.rotate_selected(-90):
-                flow_graph_update()
+            if flow_graph.rotate_selected(-90):  # updates the shapes of the rotated blocks
                 page.state_cache.save_new_state(flow_graph.export_data())
                 page.saved = False
         elif action == Actions.ELEMENT_DELETE:
@@ -470,7 +503,7 @@ class Application(Gtk.Application):
                 main.console.text_display.save(file_path)
         elif action == Actions.TOGGLE_HIDE_DISABLED_BLOCKS:
             action.set_active(not action.get_active())
-            flow_graph_update()
+            flow_graph.update_drawing()
             action.save_to_preferences()
             page.state_cache.save_new_state(flow_graph.export_data())
             Actions.NOTHING_SELECT()
@@ -480,23 +513,27 @@ class Application(Gtk.Application):
             for page in main.get_pages():
                 page.flow_graph.create_shapes()
         elif action in (Actions.TOGGLE_SNAP_TO_GRID,
-                        Actions.TOGGLE_SHOW_BLOCK_COMMENTS,
                         Actions.TOGGLE_SHOW_CODE_PREVIEW_TAB):
             action.set_active(not action.get_active())
             action.save_to_preferences()
+        elif action == Actions.TOGGLE_SHOW_BLOCK_COMMENTS:
+            action.set_active(not action.get_active())
+            action.save_to_preferences()
+            for page in main.get_pages():
+                page.flow_graph.create_shapes()  # drops the pre-rendered canvas
         elif action == Actions.TOGGLE_SHOW_FLOWGRAPH_COMPLEXITY:
             action.set_active(not action.get_active())
             action.save_to_preferences()
             for page in main.get_pages():
-                flow_graph_update(page.flow_graph)
+                page.flow_graph.update_drawing()
         elif action == Actions.TOGGLE_SHOW_PARAMETER_EXPRESSION:
             action.set_active(not action.get_active())
             action.save_to_preferences()
-            flow_graph_update()
+            flow_graph.update_drawing()
         elif action == Actions.TOGGLE_SHOW_PARAMETER_EVALUATION:
             action.set_active(not action.get_active())
             action.save_to_preferences()
-            flow_graph_update()
+            flow_graph.update_drawing()
         elif action == Actions.TOGGLE_HIDE_VARIABLES:
             action.set_active(not action.get_active())
             active = action.get_active()
@@ -521,7 +558,7 @@ class Application(Gtk.Application):
             active = action.get_active()
             Actions.NOTHING_SELECT()
             action.save_to_preferences()
-            flow_graph_update()
+            flow_graph.update_drawing()
         elif action == Actions.TOGGLE_FLOW_GRAPH_VAR_EDITOR:
             # TODO: There may be issues at startup since these aren't triggered
             # the same was as Gtk.Actions when loading preferences.
@@ -589,18 +626,16 @@ class Application(Gtk.Application):
         ##################################################
         # Undo/Redo
         ##################################################
-        elif action == Actions.FLOW_GRAPH_UNDO:
-            n = page.state_cache.get_prev_state()
-            if n:
-                flow_graph.unselect()
-                flow_graph.import_data(n)
-                flow_graph_update()
-                page.saved = False
-        elif action == Actions.FLOW_GRAPH_REDO:
-            n = page.state_cache.get_next_state()
-            if n:
+        elif action in (Actions.FLOW_GRAPH_UNDO, Actions.FLOW_GRAPH_REDO):
+            if action == Actions.FLOW_GRAPH_UNDO:
+                change = page.state_cache.get_prev_change()
+            else:
+                change = page.state_cache.get_next_change()
+            if change:
                 flow_graph.unselect()
-                flow_graph.import_data(n)
+                if change.apply_to_flow_graph(flow_graph):
+                    # partial import failed, fall back to the complete state
+                    flow_graph.import_data(page.state_cache.get_current_state())
                 flow_graph_update()
                 page.saved = False
         ##################################################
@@ -636,7 +671,9 @@ class Application(Gtk.Application):
             if file_paths:
                 self.platform.config.default_qss_theme = file_paths[0]
         elif action == Actions.FLOW_GRAPH_CLOSE:
-            main.close_page()
+            closing_page = main.page_to_be_closed or page
+            if main.close_page():
+                self.autosave.discard(closing_page)
         elif action == Actions.FLOW_GRAPH_OPEN_RECENT:
             file_path = str(args[0])[1:-1]
             main.new_page(file_path, show=True)
@@ -653,6 +690,7 @@ class Application(Gtk.Application):
                     self.platform.save_flow_graph(page.file_path, flow_graph)
                     flow_graph.grc_file_path = page.file_path
                     page.saved = True
+                    self.autosave.discard(page)
                 except IOError:
                     Messages.send_fail_save(page.file_path)
                     page.saved = False
@@ -670,6 +708,7 @@ class Application(Gtk.Application):
                     self.platform.save_flow_graph(page.file_path, flow_graph)
                     flow_graph.grc_file_path = page.file_path
                     page.saved = True
+                    self.autosave.discard(page)
                 except IOError:
                     Messages.send_fail_save(page.file_path)
                     page.saved = False
@@ -852,7 +891,9 @@ class Application(Gtk.Application):
         main.update()
 
         flow_graph.update_selected()
-        page.drawing_area.queue_draw()
+        # a new selection only changes the look of the (de)selected elements
+        flow_graph.queue_draw_damaged(everything=action != Actions.ELEMENT_SELECT)
+        flow_graph.drawing_area.update_size()  # cheap, the extents are kept up to date
 
         return True  # Action was handled
 
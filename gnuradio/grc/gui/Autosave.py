@@ -0,0 +1,182 @@
+"""
+Copyright 2016 Free Software Foundation, Inc.
+This file is part of GNU Radio
+
+SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from gi.repository import GLib
+
+from ..core.io import grc
+
+log = logging.getLogger(__name__)
+
+
+class Autosave(object):
+    """
+    Periodically write unsaved flow graphs into a recovery directory.
+
+    The exported data of a flow graph is taken on the main thread. Since
+    blocks cache their exported data, this is cheap. Serializing and writing
+    the files is done by a worker thread. Each recovery file <token>.grc comes
+    with a <token>.json file naming the original flow graph file.
+    """
+
+    def __init__(self, main_window, recovery_dir, interval):
+        """
+        Autosave constructor.
+
+        Args:
+            main_window: the main window with the pages to save
+            recovery_dir: the directory for the recovery files
+            interval: seconds between autosaves (0 disables autosave)
+        """
+        self.main_window = main_window
+        self.recovery_dir = recovery_dir
+        self.interval = interval
+
+        self._tokens = {}  # page -> token of its recovery file
+        self._exported = {}  # page -> last exported data
+        self._pending = {}  # token -> (file path, data) or None for removal
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+        if interval > 0:
+            self._worker = threading.Thread(
+                target=self._run, name='grc-autosave', daemon=True)
+            self._worker.start()
+            GLib.timeout_add_seconds(interval, self._on_timeout)
+
+    def _on_timeout(self):
+        pages = self.main_window.get_pages()
+        for page in pages:
+            if page.saved:
+                self.discard(page)
+                continue
+            data = page.flow_graph.export_data()
+            if data == self._exported.get(page):
+                continue
+            self._exported[page] = data
+            token = self._tokens.setdefault(page, uuid.uuid4().hex)
+            self._submit(token, (page.file_path, data))
+
+        for page in set(self._tokens).difference(pages):
+            self.discard(page)  # closed
+        return True  # keep the timeout
+
+    def discard(self, page):
+        """Remove the recovery file of a page (e.g. once it is saved)"""
+        self._exported.pop(page, None)
+        token = self._tokens.pop(page, None)
+        if token:
+            self._submit(token, None)
+
+    def discard_all(self):
+        """Remove all recovery files written by this instance"""
+        for page in list(self._tokens):
+            self.discard(page)
+        self.flush()
+
+    def flush(self, timeout=5.0):
+        """Wait for the worker thread to write all pending files"""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            self._wakeup.set()
+            time.sleep(0.01)
+
+    def _submit(self, token, entry):
+        with self._lock:
+            self._pending[token] = entry  # replaces an older, unwritten snapshot
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    token = next(iter(self._pending))
+                    entry = self._pending[token]
+                try:
+                    if entry is None:
+                        self._remove(token)
+                    else:
+                        self._write(token, *entry)
+                except Exception:
+                    log.exception('Autosave failed')
+                with self._lock:
+                    if self._pending.get(token) is entry:
+                        del self._pending[token]
+
+    def _paths(self, token):
+        base = os.path.join(self.recovery_dir, token)
+        return base + '.grc', base + '.json'
+
+    def _write(self, token, file_path, data):
+        grc_path, info_path = self._paths(token)
+        os.makedirs(self.recovery_dir, exist_ok=True)
+        _write_atomic(grc_path, lambda fp: grc.dump(data, fp))
+        info = {'file_path': file_path, 'pid': os.getpid(), 'time': time.time()}
+        _write_atomic(info_path, lambda fp: json.dump(info, fp))
+
+    def _remove(self, token):
+        for path in self._paths(token):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def find_recovery_files(self):
+        """
+        Find flow graphs left behind by a previous instance.
+
+        Returns:
+            a list of tuples (recovery file, original file path or '', time)
+        """
+        found = []
+        for info_path in sorted(glob.glob(os.path.join(self.recovery_dir, '*.json'))):
+            grc_path = info_path[:-len('.json')] + '.grc'
+            try:
+                with open(info_path, encoding='utf-8') as fp:
+                    info = json.load(fp)
+            except (OSError, ValueError):
+                continue
+            if not os.path.exists(grc_path) or _is_running(info.get('pid')):
+                continue
+            found.append((grc_path, info.get('file_path', ''), info.get('time', 0)))
+        return found
+
+    def remove_recovery_file(self, grc_path):
+        """Remove a recovery file found by find_recovery_files"""
+        self._remove(os.path.basename(grc_path)[:-len('.grc')])
+
+
+def _write_atomic(path, write):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fp:
+        write(fp)
+    os.replace(tmp_path, path)
+
+
+def _is_running(pid):
+    """Check if another process with this pid is running"""
+    if not pid or pid == os.getpid() or os.name == 'nt':
+        return False  # signal 0 can't be used to check on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, ValueError):
+        pass  # exists, but we are not allowed to signal it
+    return True
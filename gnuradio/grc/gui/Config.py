@@ -100,6 +100,37 @@ class Config(CoreConfig):
 
         return font_size
 
+    @property
+    def canvas_detail_zooms(self):
+        """Zoom factors below which the canvas is drawn with reduced detail and as outlines only"""
+        reduced = self._gr_prefs.get_long(
+            'grc', 'canvas_reduced_detail_zoom', Constants.CANVAS_REDUCED_DETAIL_ZOOM)
+        outline = self._gr_prefs.get_long(
+            'grc', 'canvas_outline_detail_zoom', Constants.CANVAS_OUTLINE_DETAIL_ZOOM)
+        return reduced / 100, min(outline, reduced) / 100
+
+    @property
+    def state_cache_size(self):
+        """Number of undo steps per flow graph"""
+        return self._gr_prefs.get_long('grc', 'undo_levels', Constants.STATE_CACHE_SIZE)
+
+    @property
+    def state_cache_memory(self):
+        """Memory available for undo/redo per flow graph (in bytes)"""
+        megabytes = self._gr_prefs.get_long(
+            'grc', 'undo_memory_mb', Constants.STATE_CACHE_MEMORY // (1024 * 1024))
+        return megabytes * 1024 * 1024
+
+    @property
+    def autosave_interval(self):
+        """Seconds between autosaves of unsaved flow graphs (0 disables autosave)"""
+        return self._gr_prefs.get_long('grc', 'autosave_interval', Constants.AUTOSAVE_INTERVAL)
+
+    @property
+    def recovery_dir(self):
+        return os.path.expanduser(
+            self._gr_prefs.get_string('grc', 'recovery_dir', Constants.RECOVERY_DIR))
+
     @property
     def default_qss_theme(self):
         return self._gr_prefs.get_string('qtgui', 'qss', '')
@@ -6,6 +6,7 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 """
 
+import os
 
 #from gi.repository import Gtk, Gdk
 
@@ -36,6 +37,13 @@ PARAM_FONT = "Sans 7.5"
 
 # size of the state saving cache in the flow graph (undo/redo functionality)
 STATE_CACHE_SIZE = 42
+# maximum estimated memory used for undo/redo (per flow graph)
+STATE_CACHE_MEMORY = 64 * 1024 * 1024
+
+# seconds between autosaves of unsaved flow graphs (0 to disable)
+AUTOSAVE_INTERVAL = 60
+# directory of the autosaved flow graphs
+RECOVERY_DIR = os.path.expanduser('~/.cache/grc_gnuradio/recovery')
 
 # Shared targets for drag and drop of blocks
 DND_TARGETS = []#[Gtk.TargetEntry.new('STRING', Gtk.TargetFlags.SAME_APP, 0),
@@ -49,6 +57,19 @@ PORT_LABEL_PADDING = 2
 # canvas grid size
 CANVAS_GRID_SIZE = 8
 
+# cell size of the spatial index used to find the elements in an area of the canvas
+SPATIAL_INDEX_CELL_SIZE = 256
+
+# size (in pixels) of the cached tiles of the canvas, and how many tiles are kept
+# for each tile visible in the viewport
+CANVAS_TILE_SIZE = 512
+CANVAS_TILE_CACHE_FACTOR = 2
+
+# zoom (in percent) below which blocks are drawn with their title only and connections straight
+CANVAS_REDUCED_DETAIL_ZOOM = 50
+# zoom (in percent) below which blocks are drawn as filled rectangles only
+CANVAS_OUTLINE_DETAIL_ZOOM = 25
+
 # port constraint dimensions
 PORT_BORDER_SEPARATION = 8
 PORT_SPACING = 2 * PORT_BORDER_SEPARATION
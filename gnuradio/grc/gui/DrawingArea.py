@@ -6,6 +6,7 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 """
 
+import math
 
 from gi.repository import Gtk, Gdk
 
@@ -167,7 +168,7 @@ class DrawingArea(Gtk.DrawingArea):
             coordinate=self._translate_event_coords(event),
         )
 
-    def _update_size(self):
+    def update_size(self):
         w, h = self._flow_graph.get_extents()[2:]
         scale_factor = self.get_scale_factor()
         self.set_size_request(
@@ -179,7 +180,7 @@ class DrawingArea(Gtk.DrawingArea):
         x, y = event.x, event.y
         scrollbox = self.get_parent().get_parent()
 
-        self._update_size()
+        self.update_size()
 
         def scroll(pos, adj):
             """scroll if we moved near the border"""
@@ -201,26 +202,34 @@ class DrawingArea(Gtk.DrawingArea):
         Update the flowgraph, which calls new pixmap.
         """
         self._flow_graph.update()
-        self._update_size()
+        self.update_size()
 
     def draw(self, widget, cr):
-        width = widget.get_allocated_width()
-        height = widget.get_allocated_height()
-
+        # cr is clipped to the region to repaint, so is the background
         cr.set_source_rgba(*FLOWGRAPH_BACKGROUND_COLOR)
-        cr.rectangle(0, 0, width, height)
-        cr.fill()
+        cr.paint()
 
         cr.scale(self.zoom_factor, self.zoom_factor)
         cr.set_line_width(2.0 / self.zoom_factor)
 
         if self._update_after_zoom:
-            self._flow_graph.create_labels(cr)
-            self._flow_graph.create_shapes()
-            self._update_size()
+            self._flow_graph.update_zoom(cr)
+            self.update_size()
             self._update_after_zoom = False
 
-        self._flow_graph.draw(cr)
+        self._flow_graph.draw(cr, cached=True)
+
+    def queue_draw_extents(self, extents):
+        """
+        Redraw the part of the widget showing an area of the flow graph.
+
+        Args:
+            extents: the area (x_min, y_min, x_max, y_max) in flow graph coordinates
+        """
+        x_min, y_min, x_max, y_max = (value * self.zoom_factor for value in extents)
+        margin = 4  # strokes are drawn outside the extents
+        x, y = math.floor(x_min) - margin, math.floor(y_min) - margin
+        self.queue_draw_area(x, y, math.ceil(x_max) + margin - x, math.ceil(y_max) + margin - y)
 
     def _translate_event_coords(self, event):
         return event.x / self.zoom_factor, event.y / self.zoom_factor
@@ -230,5 +239,5 @@ class DrawingArea(Gtk.DrawingArea):
         if not self._flow_graph.get_context_menu()._menu.get_visible():
             self._flow_graph.unselect()
             self._flow_graph.update_selected()
-            self.queue_draw()
+            self._flow_graph.queue_draw_damaged()
             Actions.ELEMENT_SELECT()
@@ -19,6 +19,18 @@ from ..core import Messages
 from . import Utils
 
 
+def _get_cmake_generator(builddir):
+    """Get the generator of a configured build directory (None if unconfigured)"""
+    try:
+        with open(os.path.join(builddir, 'CMakeCache.txt'), encoding='utf-8') as fp:
+            for line in fp:
+                if line.startswith('CMAKE_GENERATOR:'):
+                    return line.split('=', 1)[1].strip()
+    except (IOError, UnicodeDecodeError):
+        return None
+    return ''
+
+
 class ExecFlowGraphThread(threading.Thread):
     """Execute the flow graph as a new process and wait on it to finish."""
 
@@ -32,6 +44,7 @@ class ExecFlowGraphThread(threading.Thread):
         self.flow_graph = self.page.flow_graph
         self.xterm_executable = xterm_executable
         self.update_callback = callback
+        self._steps = []
 
         try:
             if self.flow_graph.get_option('output_language') == 'python':
@@ -78,29 +91,56 @@ class ExecFlowGraphThread(threading.Thread):
     def _cpp_popen(self):
         """
         Execute this C++ flow graph after generating and compiling it.
+        The build steps are queued and run one after the other by run().
         """
         generator = self.page.get_generator()
-        run_command = generator.file_path + \
-            '/build/' + self.flow_graph.get_option('id')
+        flow_graph_id = self.flow_graph.get_option('id')
+        run_command = os.path.join(generator.file_path, 'build', flow_graph_id)
 
         dirname = generator.file_path
         builddir = os.path.join(dirname, 'build')
 
-        if os.path.isfile(run_command):
-            os.remove(run_command)
+        nproc = Utils.get_cmake_nproc()
+        cmake_generator = _get_cmake_generator(builddir)
+
+        self._steps = []
+        if cmake_generator is None:
+            # Only configure once, 'cmake --build' re-runs the configure
+            # step by itself when CMakeLists.txt changed
+            configure = ['cmake', '..']
+            if find_executable('ninja'):
+                cmake_generator = 'Ninja'
+                configure[1:1] = ['-G', cmake_generator]
+            self._steps.append(('Configure', configure, builddir))
+
+        build = ['cmake', '--build', '.', '-j', str(nproc)]
+        object_target = {
+            'Ninja': 'CMakeFiles/{0}.dir/{0}.cpp.o',
+            'Unix Makefiles': '{0}.cpp.o',
+        }.get(cmake_generator)
+        if object_target:
+            self._steps.append(('Compile', build + [
+                '--target', object_target.format(flow_graph_id)], builddir))
+            self._steps.append(('Link', build, builddir))
+        else:
+            self._steps.append(('Build', build, builddir))
 
         xterm_executable = find_executable(self.xterm_executable)
+        run_command_args = [xterm_executable, '-e', run_command] if xterm_executable else [run_command]
+        self._steps.append((None, run_command_args, os.path.dirname(dirname)))
 
-        nproc = Utils.get_cmake_nproc()
-
-        run_command_args = f'cmake .. && cmake --build . -j{nproc} && cd ../.. && {xterm_executable} -e {run_command}'
-        Messages.send_start_exec(run_command_args)
+        Messages.send_start_exec(' && '.join(' '.join(args) for _, args, _ in self._steps))
+        return self._next_step()
 
+    def _next_step(self):
+        """Start the next queued step"""
+        self._step_label, args, cwd = self._steps.pop(0)
+        self._step_start = time.perf_counter()
         return subprocess.Popen(
-            args=run_command_args,
-            cwd=builddir,
+            args=args,
+            cwd=cwd,
             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            shell=True, universal_newlines=True
+            shell=False, universal_newlines=True
         )
 
     def run(self):
@@ -108,6 +148,18 @@ class ExecFlowGraphThread(threading.Thread):
         Wait on the executing process by reading from its stdout.
         Use GObject.idle_add when calling functions that modify gtk objects.
         """
+        while True:
+            self._wait_for_process()
+            if not self._steps or self.process.returncode != 0:
+                break
+            # report the timing of the build step and start the next one
+            GLib.idle_add(Messages.send_verbose_exec, '>>> {} took {:.2f}s\n'.format(
+                self._step_label, time.perf_counter() - self._step_start))
+            self.process = self.page.process = self._next_step()
+
+        GLib.idle_add(self.done)
+
+    def _wait_for_process(self):
         # handle completion
         r = "\n"
         while r:
@@ -120,8 +172,6 @@ class ExecFlowGraphThread(threading.Thread):
             # Wait for the process to fully terminate
             time.sleep(0.05)
 
-        GLib.idle_add(self.done)
-
     def done(self):
         """Perform end of execution tasks."""
         Messages.send_end_exec(self.process.returncode)
@@ -120,6 +120,12 @@ class OpenFileDialog(FileDialogHelper):
         return filenames
 
 
+FLOW_GRAPH_FILTERS = [
+    ('Flow Graph Files', Constants.FILE_EXTENSION),
+    ('Binary Flow Graph Files', Constants.BINARY_FLOW_GRAPH_FILE_EXTENSION),
+]
+
+
 class OpenFlowGraph(OpenFileDialog):
     title = 'Open a Flow Graph from a File...'
     filter_label = 'Flow Graph Files'
@@ -129,6 +135,9 @@ class OpenFlowGraph(OpenFileDialog):
         super(OpenFlowGraph, self).__init__(parent, current_file_path)
         self.set_select_multiple(True)
 
+    def setup_filters(self, filters=None):
+        super(OpenFlowGraph, self).setup_filters(list(FLOW_GRAPH_FILTERS))
+
 
 class OpenQSS(OpenFileDialog):
     title = 'Open a QSS theme...'
@@ -141,6 +150,15 @@ class SaveFlowGraph(SaveFileDialog):
     filter_label = 'Flow Graph Files'
     filter_ext = Constants.FILE_EXTENSION
 
+    def __init__(self, parent, current_file_path=''):
+        super(SaveFlowGraph, self).__init__(parent, current_file_path)
+        name, ext = path.splitext(path.basename(self.current_file_path))
+        if ext == Constants.BINARY_FLOW_GRAPH_FILE_EXTENSION:  # keep saving in binary
+            self.set_current_name(name + ext)
+
+    def setup_filters(self, filters=None):
+        super(SaveFlowGraph, self).setup_filters(list(FLOW_GRAPH_FILTERS))
+
 
 class SaveConsole(SaveFileDialog):
     title = 'Save Console to a File...'
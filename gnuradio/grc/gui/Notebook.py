@@ -47,6 +47,9 @@ class Notebook(Gtk.Notebook):
             page_num: new page number
         """
         self.current_page = self.get_nth_page(page_num)
+        for other_num in range(self.get_n_pages()):
+            if other_num != page_num:  # hidden now, free its tiles
+                self.get_nth_page(other_num).flow_graph.drop_cached_tiles()
         Actions.PAGE_CHANGE()
 
     def _handle_scroll(self, widget, event):
@@ -91,9 +94,10 @@ class Page(Gtk.HBox):
         self.saved = True
 
         # import the file
-        initial_state = flow_graph.parent_platform.parse_flow_graph(file_path)
-        flow_graph.import_data(initial_state)
-        self.state_cache = StateCache(initial_state)
+        flow_graph.parent_platform.import_flow_graph(flow_graph, file_path)
+        config = flow_graph.parent_platform.config
+        self.state_cache = StateCache(
+            flow_graph.export_data(), config.state_cache_size, config.state_cache_memory)
 
         # tab box to hold label and close button
         self.label = Gtk.Label()
@@ -6,87 +6,234 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 """
 
+import collections
+
 from . import Actions
-from .Constants import STATE_CACHE_SIZE
+from .Constants import STATE_CACHE_SIZE, STATE_CACHE_MEMORY
+
+
+class StateChange(collections.namedtuple('StateChange', 'options blocks connections')):
+    """
+    The difference between two states of a flow graph.
+
+    options: a tuple (old, new) of options data or None if unchanged
+    blocks: a dict of block names to tuples (old, new) of block data,
+            None for the data of a block which was added or removed
+    connections: a tuple (removed, added) of sets of connection tuples
+    """
+
+    @classmethod
+    def between(cls, old_state, new_state):
+        """
+        Get the changes from one state to another.
+
+        Args:
+            old_state: the old state (nested data)
+            new_state: the new state (nested data)
+
+        Returns:
+            the change or None if both states are the same
+        """
+        old_options, new_options = old_state.get('options'), new_state.get('options')
+        options = (old_options, new_options) if old_options != new_options else None
+
+        old_blocks = _blocks_by_name(old_state)
+        new_blocks = _blocks_by_name(new_state)
+        blocks = {}
+        for name in old_blocks.keys() | new_blocks.keys():
+            old, new = old_blocks.get(name), new_blocks.get(name)
+            if old != new:
+                blocks[name] = (old, new)
+
+        old_connections = _connections(old_state)
+        new_connections = _connections(new_state)
+        connections = (old_connections - new_connections,
+                       new_connections - old_connections)
+
+        if options is None and not blocks and not any(connections):
+            return None
+        return cls(options, blocks, connections)
+
+    def reversed(self):
+        """Get the change which reverts this one"""
+        removed, added = self.connections
+        return StateChange(
+            options=self.options[::-1] if self.options else None,
+            blocks={name: (new, old) for name, (old, new) in self.blocks.items()},
+            connections=(added, removed),
+        )
+
+    def apply_to_state(self, state):
+        """
+        Apply this change to a state.
+
+        Args:
+            state: the state this change was recorded from (nested data)
+
+        Returns:
+            the changed state (nested data)
+        """
+        new_state = collections.OrderedDict(state)
+        if self.options:
+            new_state['options'] = self.options[1]
+
+        blocks = []
+        for block_data in state.get('blocks', []):
+            if block_data['name'] in self.blocks:
+                block_data = self.blocks[block_data['name']][1]
+            if block_data is not None:
+                blocks.append(block_data)
+        existing = set(_blocks_by_name(state))
+        blocks.extend(new for name, (old, new) in self.blocks.items()
+                      if new is not None and name not in existing)
+        new_state['blocks'] = blocks
+
+        removed, added = self.connections
+        new_state['connections'] = sorted((_connections(state) - removed) | added)
+        return new_state
+
+    def apply_to_flow_graph(self, flow_graph):
+        """
+        Apply this change to a flow graph, without re-importing all of it.
+
+        Args:
+            flow_graph: the flow graph in the state this change was recorded from
+
+        Returns:
+            True if some connections could not be made
+        """
+        removed, added = self.connections
+        return flow_graph.import_changes(
+            options=self.options[1] if self.options else None,
+            blocks_data=[new for old, new in self.blocks.values() if new is not None],
+            connections=sorted(added),
+            removed_blocks=[name for name, (old, new) in self.blocks.items() if new is None],
+            removed_connections=removed,
+        )
+
+    @property
+    def size(self):
+        """An estimate of the memory used by this change (in bytes)"""
+        return _estimate_size(self)
+
+
+def _blocks_by_name(state):
+    return {block_data['name']: block_data for block_data in state.get('blocks', [])}
+
+
+def _connections(state):
+    return {tuple(connection) for connection in state.get('connections', [])}
+
+
+def _estimate_size(data):
+    if isinstance(data, str):
+        return 50 + len(data)
+    if isinstance(data, dict):
+        return 100 + sum(_estimate_size(k) + _estimate_size(v) for k, v in data.items())
+    if isinstance(data, (list, tuple, set, frozenset)):
+        return 60 + sum(_estimate_size(item) for item in data)
+    return 30
 
 
 class StateCache(object):
     """
-    The state cache is an interface to a list to record data/states and to revert to previous states.
-    States are recorded into the list in a circular fassion by using an index for the current state,
-    and counters for the range where states are stored.
+    The state cache records the changes to a flow graph and reverts to previous states.
+    Only the current state is stored completely. For undo and redo, the changes between
+    states are kept, as long as their number and estimated size fits into the limits.
     """
 
-    def __init__(self, initial_state):
+    def __init__(self, initial_state, max_states=STATE_CACHE_SIZE, max_memory=STATE_CACHE_MEMORY):
         """
         StateCache constructor.
 
         Args:
             initial_state: the initial state (nested data)
+            max_states: the maximum number of states to go back to
+            max_memory: the maximum estimated size of all changes (in bytes)
         """
-        self.states = [None] * STATE_CACHE_SIZE  # fill states
-        self.current_state_index = 0
-        self.num_prev_states = 0
-        self.num_next_states = 0
-        self.states[0] = initial_state
+        self.current_state = initial_state
+        self.prev_changes = collections.deque()  # changes leading to the current state
+        self.next_changes = []  # changes to redo, the next one last
+        self.max_states = max(max_states, 1)
+        self.max_memory = max_memory
+        self.memory = 0
         self.update_actions()
 
+    @property
+    def num_prev_states(self):
+        return len(self.prev_changes)
+
+    @property
+    def num_next_states(self):
+        return len(self.next_changes)
+
     def save_new_state(self, state):
         """
         Save a new state.
-        Place the new state at the next index and add one to the number of previous states.
+        Record the change to the new state and drop the changes to redo.
 
         Args:
             state: the new state
         """
-        self.current_state_index = (
-            self.current_state_index + 1) % STATE_CACHE_SIZE
-        self.states[self.current_state_index] = state
-        self.num_prev_states = self.num_prev_states + 1
-        if self.num_prev_states == STATE_CACHE_SIZE:
-            self.num_prev_states = STATE_CACHE_SIZE - 1
-        self.num_next_states = 0
+        change = StateChange.between(self.current_state, state)
+        self.current_state = state
+        if change is None:
+            return
+        for _, size in self.next_changes:
+            self.memory -= size
+        self.next_changes.clear()
+        self._push_prev_change(change)
         self.update_actions()
 
+    def _push_prev_change(self, change):
+        size = change.size
+        self.prev_changes.append((change, size))
+        self.memory += size
+        while self.prev_changes and (len(self.prev_changes) > self.max_states or
+                                     self.memory > self.max_memory):
+            _, dropped_size = self.prev_changes.popleft()
+            self.memory -= dropped_size
+
     def get_current_state(self):
         """
-        Get the state at the current index.
+        Get the current state.
 
         Returns:
             the current state (nested data)
         """
         self.update_actions()
-        return self.states[self.current_state_index]
+        return self.current_state
 
-    def get_prev_state(self):
+    def get_prev_change(self):
         """
-        Get the previous state and decrement the current index.
+        Go back to the previous state.
 
         Returns:
-            the previous state or None
+            the change to apply to the flow graph or None
         """
-        if self.num_prev_states > 0:
-            self.current_state_index = (
-                self.current_state_index + STATE_CACHE_SIZE - 1) % STATE_CACHE_SIZE
-            self.num_next_states = self.num_next_states + 1
-            self.num_prev_states = self.num_prev_states - 1
-            return self.get_current_state()
-        return None
+        if not self.prev_changes:
+            return None
+        change, size = self.prev_changes.pop()
+        self.next_changes.append((change, size))
+        change = change.reversed()
+        self.current_state = change.apply_to_state(self.current_state)
+        self.update_actions()
+        return change
 
-    def get_next_state(self):
+    def get_next_change(self):
         """
-        Get the nest state and increment the current index.
+        Go forward to the next state.
 
         Returns:
-            the next state or None
-        """
-        if self.num_next_states > 0:
-            self.current_state_index = (
-                self.current_state_index + 1) % STATE_CACHE_SIZE
-            self.num_next_states = self.num_next_states - 1
-            self.num_prev_states = self.num_prev_states + 1
-            return self.get_current_state()
-        return None
+            the change to apply to the flow graph or None
+        """
+        if not self.next_changes:
+            return None
+        change, size = self.next_changes.pop()
+        self.prev_changes.append((change, size))
+        self.current_state = change.apply_to_state(self.current_state)
+        self.update_actions()
+        return change
 
     def update_actions(self):
         """
@@ -10,10 +10,11 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 import math
 
-#from gi.repository import Gtk, Pango, PangoCairo
+from gi.repository import Pango, PangoCairo
 
-from . import colors
+from . import colors, detail
 from .drawable import Drawable
+from .layouts import CachedLayout
 from .. import Actions, Utils, Constants
 from ...core import utils
 from ...core.blocks import Block as CoreBlock
@@ -38,7 +39,14 @@ class Block(CoreBlock, Drawable):
             None,  # params
         ]
         self._surface_layouts_offsets = 0, 0
+        self._title_offset = 0, 0  # of the title shown alone (reduced detail)
         self._comment_layout = None
+        self._cached_layouts = [
+            CachedLayout(),  # title
+            CachedLayout(lambda layout: layout.set_spacing(
+                Constants.LABEL_SEPARATION * Pango.SCALE)),  # params
+            CachedLayout(),  # comment
+        ]
 
         self._area = []
         self._border_color = self._bg_color = colors.BLOCK_ENABLED_COLOR
@@ -155,25 +163,18 @@ class Block(CoreBlock, Drawable):
                     Constants.PORT_SPACING
 
     def create_labels(self, cr=None):
-        """Create the labels for the signal block."""
-
-        # (Re-)creating layouts here, because layout.context_changed() doesn't seems to work (after zoom)
-        title_layout, params_layout = self._surface_layouts = [
-            Gtk.DrawingArea().create_pango_layout(''),  # title
-            Gtk.DrawingArea().create_pango_layout(''),  # params
-        ]
-
-        if cr:  # to fix up extents after zooming
-            PangoCairo.update_layout(cr, title_layout)
-            PangoCairo.update_layout(cr, params_layout)
-
-        title_layout.set_markup(
+        """
+        Create the labels for the signal block.
+        The layouts are only re-created if their markup or the zoom changed.
+        """
+        title_cache, params_cache, _ = self._cached_layouts
+        title_layout = title_cache.update(
             '<span {foreground} font_desc="{font}"><b>{label}</b></span>'.format(
                 foreground='foreground="red"' if not self.is_valid() else '', font=Constants.BLOCK_FONT,
                 label=Utils.encode(self.label)
             )
         )
-        title_width, title_height = title_layout.get_size()
+        title_width, title_height = title_cache.size
 
         force_show_id = Actions.TOGGLE_SHOW_BLOCK_IDS.get_active()
 
@@ -185,9 +186,9 @@ class Block(CoreBlock, Drawable):
             markups = ['<span font_desc="{font}"><b>key: </b>{key}</span>'.format(
                 font=Constants.PARAM_FONT, key=self.key)]
 
-        params_layout.set_spacing(Constants.LABEL_SEPARATION * Pango.SCALE)
-        params_layout.set_markup('\n'.join(markups))
-        params_width, params_height = params_layout.get_size() if markups else (0, 0)
+        params_layout = params_cache.update('\n'.join(markups))
+        params_width, params_height = params_cache.size if markups else (0, 0)
+        self._surface_layouts = [title_layout, params_layout]
 
         label_width = max(title_width, params_width) / Pango.SCALE
         label_height = title_height / Pango.SCALE
@@ -227,6 +228,7 @@ class Block(CoreBlock, Drawable):
             (0, (height - label_height) / 2.0 +
              Constants.LABEL_SEPARATION + title_height / Pango.SCALE)
         ]
+        self._title_offset = 0, (height - title_height / Pango.SCALE) / 2.0
 
         title_layout.set_width(width * Pango.SCALE)
         title_layout.set_alignment(Pango.Alignment.CENTER)
@@ -262,11 +264,12 @@ class Block(CoreBlock, Drawable):
             markups.append('<span foreground="{foreground}" font_desc="{font}">{comment}</span>'.format(
                 foreground='#444' if self.enabled else '#888', font=Constants.BLOCK_FONT, comment=Utils.encode(comment)
             ))
+        comment_cache = self._cached_layouts[2]
         if markups:
-            layout = self._comment_layout = Gtk.DrawingArea().create_pango_layout('')
-            layout.set_markup(''.join(markups))
+            self._comment_layout = comment_cache.update(''.join(markups))
         else:
             self._comment_layout = None
+            comment_cache.clear()
 
     def draw(self, cr):
         """
@@ -275,6 +278,12 @@ class Block(CoreBlock, Drawable):
         border_color = colors.HIGHLIGHT_COLOR if self.highlighted else self._border_color
         cr.translate(*self.coordinate)
 
+        if detail.level == detail.OUTLINE:  # zoomed out: a filled rectangle only
+            cr.rectangle(*self._area)
+            cr.set_source_rgba(*(border_color if self.highlighted else self._bg_color))
+            cr.fill()
+            return
+
         for port in self.active_ports():  # ports first
             cr.save()
             port.draw(cr)
@@ -291,10 +300,13 @@ class Block(CoreBlock, Drawable):
             cr.rotate(-math.pi / 2)
             cr.translate(-self.width, 0)
         cr.set_source_rgba(*self._font_color)
+        if detail.level == detail.REDUCED:  # the title only
+            cr.translate(*self._title_offset)
+            PangoCairo.show_layout(cr, self._surface_layouts[0])
+            return
         for layout, offset in zip(self._surface_layouts, self._surface_layouts_offsets):
             cr.save()
             cr.translate(*offset)
-            PangoCairo.update_layout(cr, layout)
             PangoCairo.show_layout(cr, layout)
             cr.restore()
 
@@ -309,7 +321,8 @@ class Block(CoreBlock, Drawable):
         Returns:
             this block, a port, or None
         """
-        for port in self.active_ports():
+        ports = self.active_ports() if detail.level != detail.OUTLINE else ()  # not drawn
+        for port in ports:
             port_selected = port.what_is_selected(
                 coor=[a - b for a, b in zip(coor, self.coordinate)],
                 coor_m=[
@@ -331,18 +344,17 @@ class Block(CoreBlock, Drawable):
 
         cr.save()
         cr.translate(x, y)
-        PangoCairo.update_layout(cr, self._comment_layout)
         PangoCairo.show_layout(cr, self._comment_layout)
         cr.restore()
 
     def get_extents(self):
-        extent = Drawable.get_extents(self)
+        x_min, y_min, x_max, y_max = Drawable.get_extents(self)
         x, y = self.coordinate
         for port in self.active_ports():
-            extent = (min_or_max(xy, offset + p_xy) for offset, min_or_max, xy, p_xy in zip(
-                (x, y, x, y), (min, min, max, max), extent, port.get_extents()
-            ))
-        return tuple(extent)
+            p_x_min, p_y_min, p_x_max, p_y_max = port.get_extents()
+            x_min, y_min = min(x_min, x + p_x_min), min(y_min, y + p_y_min)
+            x_max, y_max = max(x_max, x + p_x_max), max(y_max, y + p_y_max)
+        return x_min, y_min, x_max, y_max
 
     def get_extents_comment(self):
         x, y = self.coordinate
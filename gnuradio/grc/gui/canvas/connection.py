@@ -8,11 +8,12 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 
 from argparse import Namespace
-from math import pi
 
-from . import colors
+import cairo
+import numpy
+
+from . import colors, detail
 from .drawable import Drawable
-from .. import Utils
 from ..Constants import (
     CONNECTOR_ARROW_BASE,
     CONNECTOR_ARROW_HEIGHT,
@@ -41,12 +42,12 @@ class Connection(CoreConnection, Drawable):
         self._line_width_factor = 1.0
         self._color1 = self._color2 = None
 
-        self._current_port_rotations = self._current_coordinates = None
-
-        self._rel_points = None  # connection coordinates relative to sink/source
+        # geometry, see update_geometry()
+        self._geometry_key = None  # connector coordinates and rotations it was calculated for
+        self._points = None  # line, curve and line, relative to the source connector
+        self._extents = None
         self._arrow_rotation = 0.0  # rotation of the arrow in radians
-        self._current_cr = None  # for what_is_selected() of curved line
-        self._line_path = None
+        self._line_width = None  # for what_is_selected() of curved line
 
     @nop_write
     @property
@@ -66,22 +67,9 @@ class Connection(CoreConnection, Drawable):
         return 0
 
     def create_shapes(self):
-        """Pre-calculate relative coordinates."""
+        """Update the colors and invalidate the geometry (the ports may have moved)."""
         source = self.source_port
         sink = self.sink_port
-        rotate = Utils.get_rotated_coordinate
-
-        # first two components relative to source connector, rest relative to sink connector
-        self._rel_points = [
-            # line from 0,0 to here, bezier curve start
-            rotate((15, 0), source.rotation),
-            rotate((50, 0), source.rotation),  # bezier curve control point 1
-            rotate((-50, 0), sink.rotation),  # bezier curve control point 2
-            rotate((-15, 0), sink.rotation),  # bezier curve end
-            rotate((-CONNECTOR_ARROW_HEIGHT, 0),
-                   sink.rotation),  # line to arrow head
-        ]
-        self._current_coordinates = None  # triggers _make_path()
 
         def get_domain_color(domain_id):
             domain = self.parent_platform.domains.get(domain_id, None)
@@ -97,54 +85,42 @@ class Connection(CoreConnection, Drawable):
             self._color1 = get_domain_color(source.domain)
             self._color2 = get_domain_color(sink.domain)
 
-        self._arrow_rotation = -sink.rotation / 180 * pi
-
-        if not self._bounding_points:
-            self._make_path()  # no cr set --> only sets bounding_points for extent
+        self._geometry_key = None
 
-    def _make_path(self, cr=None):
-        x_pos, y_pos = self.source_port.connector_coordinate_absolute
-        # x_start, y_start = self.source_port.get_connector_coordinate()
-        x_end, y_end = self.sink_port.connector_coordinate_absolute
+    def _get_geometry_key(self):
+        source, sink = self.source_port, self.sink_port
+        return (tuple(source.connector_coordinate_absolute), tuple(sink.connector_coordinate_absolute),
+                source.rotation, sink.rotation)
 
-        # sink connector relative to sink connector
-        x_e, y_e = x_end - x_pos, y_end - y_pos
+    def _update_geometry(self):
+        """Re-calculate the geometry, if the ports moved since it was calculated last"""
+        if self._geometry_key != self._get_geometry_key():
+            update_geometry([self])
 
-        # make rel_point all relative to source connector
-        p0 = 0, 0  # x_start - x_pos, y_start - y_pos
-        p1, p2, (dx_e1, dy_e1), (dx_e2, dy_e2), (dx_e3,
-                                                 dy_e3) = self._rel_points
-        p3 = x_e + dx_e1, y_e + dy_e1
-        p4 = x_e + dx_e2, y_e + dy_e2
-        p5 = x_e + dx_e3, y_e + dy_e3
-        self._bounding_points = p0, p1, p4, p5  # ignores curved part =(
-
-        if cr:
-            cr.move_to(*p0)
-            cr.line_to(*p1)
+    def get_extents(self):
+        """
+        Get the extents of the line, its curve and the arrow head.
+        These are updated to the current port positions, if the blocks moved.
+        """
+        self._update_geometry()
+        return self._extents
+
+    def _append_path(self, cr, curved=True):
+        p0, p1, p2, p3, p4, p5 = self._points
+        cr.move_to(*p0)
+        cr.line_to(*p1)
+        if curved:
             cr.curve_to(*(p2 + p3 + p4))
-            cr.line_to(*p5)
-            self._line_path = cr.copy_path()
+        else:  # zoomed out
+            cr.line_to(*p4)
+        cr.line_to(*p5)
 
     def draw(self, cr):
         """
         Draw the connection.
         """
-        self._current_cr = cr
-        sink = self.sink_port
-        source = self.source_port
-
-        # check for changes
-        port_rotations = (source.rotation, sink.rotation)
-        if self._current_port_rotations != port_rotations:
-            self.create_shapes()  # triggers _make_path() call below
-            self._current_port_rotations = port_rotations
-
-        new_coordinates = (source.parent_block.coordinate,
-                           sink.parent_block.coordinate)
-        if self._current_coordinates != new_coordinates:
-            self._make_path(cr)
-            self._current_coordinates = new_coordinates
+        self._line_width = cr.get_line_width()
+        self._update_geometry()
 
         color1, color2 = (
             None if color is None else
@@ -158,9 +134,9 @@ class Connection(CoreConnection, Drawable):
         cr.translate(*self.coordinate)
         cr.set_line_width(self._line_width_factor * cr.get_line_width())
         cr.new_path()
-        cr.append_path(self._line_path)
+        self._append_path(cr, curved=detail.level == detail.FULL)
 
-        arrow_pos = cr.get_current_point()
+        arrow_pos = self._points[-1]
 
         if color1:  # not a message connection
             cr.set_source_rgba(*color1)
@@ -175,6 +151,8 @@ class Connection(CoreConnection, Drawable):
         else:
             cr.new_path()
 
+        if detail.level == detail.OUTLINE:
+            return  # no arrow (nor ports) when zoomed out
         cr.move_to(*arrow_pos)
         cr.set_source_rgba(*color2)
         cr.rotate(self._arrow_rotation)
@@ -190,25 +168,118 @@ class Connection(CoreConnection, Drawable):
             self if one of the areas/lines encompasses coor, else None.
         """
         if coor_m:
+            self._update_geometry()  # for the bounding points
             return Drawable.what_is_selected(self, coor, coor_m)
 
         x, y = [a - b for a, b in zip(coor, self.coordinate)]
 
-        cr = self._current_cr
-
-        if cr is None:
-            return
-        cr.save()
+        if self._line_width is None:
+            return  # not drawn yet
+        self._update_geometry()
+        # the line may have been drawn on a cached tile, test on a context of our own
+        cr = _get_hit_test_context()
         cr.new_path()
-        cr.append_path(self._line_path)
-        cr.set_line_width(cr.get_line_width() * LINE_SELECT_SENSITIVITY)
+        self._append_path(cr)
+        cr.set_line_width(self._line_width * LINE_SELECT_SENSITIVITY)
         hit = cr.in_stroke(x, y)
-        cr.restore()
+        cr.new_path()
 
         if hit:
             return self
 
 
+def _direction(rotation):
+    """Unit vectors pointing into the rotations (array of multiples of 90 degrees)"""
+    index = (rotation // 90).astype(int) % 4
+    return numpy.array([(1, 0), (0, -1), (-1, 0), (0, 1)], dtype=float)[index]
+
+
+def _bezier_extents(p0, p1, p2, p3):
+    """
+    Get the exact extents of cubic bezier curves.
+
+    Args:
+        p0, p1, p2, p3: the control points, arrays of shape (n, 2)
+
+    Returns:
+        arrays of the minimum and maximum coordinates, of shape (n, 2)
+    """
+    # the extremes are at the end points and where the derivative is 0:
+    # a t^2 + b t + c = 0 (the derivative divided by 3)
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        root = numpy.sqrt(b * b - 4 * a * c)  # nan if there is no real solution
+        linear = numpy.abs(a) < 1e-9
+        t1 = numpy.where(linear, -c / b, (-b + root) / (2 * a))
+        t2 = numpy.where(linear, numpy.nan, (-b - root) / (2 * a))
+
+    candidates = [p0, p3]
+    for t in (t1, t2):
+        t = numpy.where((t >= 0) & (t <= 1), t, numpy.nan)
+        s = 1 - t
+        candidates.append(s ** 3 * p0 + 3 * s * s * t * p1 + 3 * s * t * t * p2 + t ** 3 * p3)
+    candidates = numpy.stack(candidates)  # nan for solutions out of range
+    return numpy.nanmin(candidates, axis=0), numpy.nanmax(candidates, axis=0)
+
+
+def update_geometry(connections):
+    """
+    Calculate the geometry of connections for their current port positions, all at once.
+    A connection is drawn as a line from the source connector, a bezier curve and
+    a line to the arrow head, which ends at the sink connector.
+
+    Args:
+        connections: the connections to update
+    """
+    connections = list(connections)
+    if not connections:
+        return
+    keys = [connection._get_geometry_key() for connection in connections]
+    start = numpy.array([key[0] for key in keys], dtype=float)
+    end = numpy.array([key[1] for key in keys], dtype=float)
+    sink_rotation = numpy.array([key[3] for key in keys], dtype=float)
+    source_direction = _direction(numpy.array([key[2] for key in keys], dtype=float))
+    sink_direction = _direction(sink_rotation)
+
+    # relative to the source connector
+    end -= start
+    p0 = numpy.zeros_like(end)
+    p1 = 15 * source_direction  # bezier curve start
+    p2 = 50 * source_direction  # bezier curve control point 1
+    p3 = end - 50 * sink_direction  # bezier curve control point 2
+    p4 = end - 15 * sink_direction  # bezier curve end
+    p5 = end - CONNECTOR_ARROW_HEIGHT * sink_direction  # line to arrow head
+
+    curve_min, curve_max = _bezier_extents(p1, p2, p3, p4)
+    margin = CONNECTOR_ARROW_BASE / 2  # covers the arrow head and the line width
+    extents_min = numpy.minimum.reduce([curve_min, p0, p5, end]) - margin + start
+    extents_max = numpy.maximum.reduce([curve_max, p0, p5, end]) + margin + start
+
+    points = numpy.stack([p0, p1, p2, p3, p4, p5], axis=1).tolist()
+    extents = numpy.hstack([extents_min, extents_max]).tolist()
+    arrow_rotations = numpy.radians(-sink_rotation)
+    for connection, key, connection_points, connection_extents, arrow_rotation in zip(
+            connections, keys, points, extents, arrow_rotations.tolist()):
+        connection._geometry_key = key
+        connection_points = [tuple(point) for point in connection_points]
+        connection._points = connection_points
+        connection._bounding_points = tuple(connection_points[i] for i in (0, 1, 4, 5))
+        connection._extents = tuple(connection_extents)
+        connection._arrow_rotation = arrow_rotation
+
+
+_hit_test_context = None
+
+
+def _get_hit_test_context():
+    global _hit_test_context
+    if _hit_test_context is None:
+        _hit_test_context = cairo.Context(cairo.ImageSurface(cairo.FORMAT_A8, 1, 1))
+    return _hit_test_context
+
+
 class DummyCoreConnection(object):
     def __init__(self, source_port, **kwargs):
         self.parent_platform = source_port.parent_platform
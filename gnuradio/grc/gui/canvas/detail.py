@@ -0,0 +1,43 @@
+"""
+Copyright 2016 Free Software Foundation, Inc.
+This file is part of GNU Radio
+
+SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+
+# levels of detail the canvas is drawn with, depending on the zoom
+OUTLINE = 0  # blocks as filled rectangles, no ports or labels, straight connections
+REDUCED = 1  # blocks with their title only, no port labels or comments, straight connections
+FULL = 2  # everything
+
+level = FULL  # the level of the current drawing
+
+
+def get_level(zoom, reduced_zoom, outline_zoom):
+    """
+    Get the level of detail for a zoom factor.
+
+    Args:
+        zoom: the zoom factor
+        reduced_zoom: the zoom factor below which less detail is drawn
+        outline_zoom: the zoom factor below which only outlines are drawn
+
+    Returns:
+        one of FULL, REDUCED and OUTLINE
+    """
+    if zoom >= reduced_zoom:
+        return FULL
+    return REDUCED if zoom >= outline_zoom else OUTLINE
+
+
+def update_level(cr, reduced_zoom, outline_zoom):
+    """
+    Set the level of detail for drawing on a cairo context (by its scale).
+
+    Returns:
+        the new level
+    """
+    global level
+    level = get_level(cr.get_matrix().xx, reduced_zoom, outline_zoom)
+    return level
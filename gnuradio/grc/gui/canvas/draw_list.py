@@ -0,0 +1,97 @@
+"""
+Copyright 2016 Free Software Foundation, Inc.
+This file is part of GNU Radio
+
+SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+
+from itertools import count
+
+
+class DrawList(object):
+    """
+    The elements to draw, in layers. Elements in later layers are drawn on top.
+    Within a layer, elements are kept in the order they were added to it.
+    Elements only move if their layer changes, the list is never re-sorted.
+    """
+
+    def __init__(self, layer_of):
+        """
+        DrawList constructor.
+
+        Args:
+            layer_of: a function returning the layer of an element (a sortable key)
+                      or None to hide the element
+        """
+        self._layer_of = layer_of
+        self._layers = {}  # layer -> dict of its elements (ordered)
+        self._keys = {}  # element -> (layer, sequence number)
+        self._counter = count()
+        self._list = None  # all elements in drawing order, built on demand
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, element):
+        return element in self._keys
+
+    def __iter__(self):
+        if self._list is None:
+            self._list = [element for layer in sorted(self._layers)
+                          for element in self._layers[layer]]
+        return iter(self._list)
+
+    def sort_key(self, element):
+        """Get a key to sort elements of this list in drawing order"""
+        return self._keys[element]
+
+    def update(self, element):
+        """
+        Add, move or hide an element according to its current layer.
+
+        Returns:
+            True if the element was added, moved or hidden
+        """
+        layer = self._layer_of(element)
+        key = self._keys.get(element)
+        if key is not None and key[0] == layer:
+            return False
+        if key is not None:
+            self.remove(element)
+        if layer is not None:
+            self._layers.setdefault(layer, {})[element] = None
+            self._keys[element] = layer, next(self._counter)
+            self._list = None
+        return key is not None or layer is not None
+
+    def remove(self, element):
+        """Remove an element, if it is in the list"""
+        key = self._keys.pop(element, None)
+        if key is None:
+            return
+        layer = self._layers[key[0]]
+        del layer[element]
+        if not layer:
+            del self._layers[key[0]]
+        self._list = None
+
+    def sync(self, elements):
+        """
+        Update the list to contain the given elements (and their layers).
+
+        Args:
+            elements: all elements which may be drawn
+
+        Returns:
+            True if anything changed
+        """
+        elements = list(elements)
+        members = set(elements)
+        changed = False
+        for element in [element for element in self._keys if element not in members]:
+            self.remove(element)
+            changed = True
+        for element in elements:
+            changed |= self.update(element)
+        return changed
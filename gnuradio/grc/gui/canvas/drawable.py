@@ -155,12 +155,9 @@ class Drawable(object):
                     return self
 
     def get_extents(self):
-        x_min, y_min = x_max, y_max = self.coordinate
-        x_min += min(x for x, y in self._bounding_points)
-        y_min += min(y for x, y in self._bounding_points)
-        x_max += max(x for x, y in self._bounding_points)
-        y_max += max(y for x, y in self._bounding_points)
-        return x_min, y_min, x_max, y_max
+        x, y = self.coordinate
+        xs, ys = zip(*self._bounding_points)
+        return x + min(xs), y + min(ys), x + max(xs), y + max(ys)
 
     def mouse_over(self):
         pass
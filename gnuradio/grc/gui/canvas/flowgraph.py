@@ -9,20 +9,28 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 import ast
 import functools
+import logging
 import random
+import time
+from contextlib import contextmanager
 from shutil import which as find_executable
 from itertools import count
 
 from gi.repository import GLib, Gtk
 
-from . import colors
+from . import colors, detail, layouts
 from .drawable import Drawable
-from .connection import DummyConnection
+from .connection import DummyConnection, update_geometry as update_connection_geometry
+from .draw_list import DrawList
+from .spatial_index import SpatialIndex
+from .tile_cache import TileCache
 from .. import Actions, Constants, Utils, Bars, Dialogs, MainWindow
 from ..external_editor import ExternalEditor
 from ...core import Messages
 from ...core.FlowGraph import FlowGraph as CoreFlowgraph
 
+log = logging.getLogger(__name__)
+
 
 class _ContextMenu(object):
     """
@@ -82,7 +90,14 @@ class FlowGraph(CoreFlowgraph, Drawable):
         self.get_context_menu = lambda: self._context_menu
 
         self._new_connection = None
-        self._elements_to_draw = []
+        self._hide_disabled_blocks = self._hide_variables = False
+        self._elements_to_draw = DrawList(self._draw_layer)
+        self._spatial_index = SpatialIndex()  # extents of the elements to draw
+        self._tile_cache = TileCache()  # pre-rendered static elements
+        self._dynamic_elements = set()  # elements drawn on top of the tiles
+        self._damaged = []  # extents to redraw, None to redraw everything
+        self._detail_zooms = self.parent_platform.config.canvas_detail_zooms
+        self.update_timings = {}  # stage of the update -> seconds it took last time
         self._external_updaters = {}
 
     def _get_unique_id(self, base_id=''):
@@ -184,32 +199,87 @@ class FlowGraph(CoreFlowgraph, Drawable):
             return True
         return False
 
+    @contextmanager
+    def _timed(self, stage):
+        """Record how long a stage of an update takes in update_timings"""
+        start = time.perf_counter()
+        yield
+        self.update_timings[stage] = duration = time.perf_counter() - start
+        log.debug('%s took %.1f ms', stage, duration * 1000)
+
     def update(self):
         """
         Call the top level rewrite and validate.
         Call the top level create labels and shapes.
         """
-        self.rewrite()
-        self.validate()
-        self.update_elements_to_draw()
-        self.create_labels()
-        self.create_shapes()
+        with self._timed('rewrite'):
+            self.rewrite()
+        with self._timed('validate'):
+            self.validate()
+        self.update_drawing()
+
+    def update_drawing(self, cr=None):
+        """
+        Update the elements to draw, their labels and shapes.
+        Use this instead of update() if only the way the flow graph is shown
+        changed (e.g. hidden elements, zoom), not the flow graph itself.
+
+        Args:
+            cr: the cairo context to measure labels with (after zooming)
+        """
+        with self._timed('elements_to_draw'):
+            self.update_elements_to_draw()
+        with self._timed('labels'):
+            self.create_labels(cr)
+        with self._timed('shapes'):
+            self.create_shapes()
+
+    def update_zoom(self, cr):
+        """
+        Update the drawing after zooming.
+        The labels are only re-measured at zoom factors showing them all,
+        zooming at a reduced level of detail leaves the elements as they are.
+
+        Args:
+            cr: the cairo context of the canvas (scaled by the new zoom)
+        """
+        if detail.update_level(cr, *self._detail_zooms) == detail.FULL:
+            self.update_drawing(cr)
+
+    def update_geometry(self, blocks):
+        """
+        Re-create the shapes of some blocks and their connections only.
+        Use this if blocks were moved or rotated.
+
+        Args:
+            blocks: the changed blocks
+        """
+        with self._timed('geometry'):
+            self._update_shapes(blocks)
 
     def reload(self):
         """
         Reload flow-graph (with updated blocks)
+        Only the blocks whose description changed are rebuilt,
+        all others keep their position and selection.
 
-        Args:
-            page: the page to reload (None means current)
         Returns:
             False if some error occurred during import
         """
-        success = False
-        data = self.export_data()
-        if data:
-            self.unselect()
-            success = self.import_data(data)
-            self.update()
+        selected_names = {block.name for block in self.selected_blocks()}
+        names, success = self.reload_blocks()
+        if not names:
+            return success
+
+        # the rebuilt blocks replace the selected ones
+        self.selected_elements = {
+            element for element in self.selected_elements
+            if element in self.blocks or element in self.connections
+        }
+        self.selected_elements.update(
+            block for block in self.blocks
+            if block.name in names and block.name in selected_names)
+        self.update()
         return success
 
     ###########################################################################
@@ -371,6 +441,7 @@ class FlowGraph(CoreFlowgraph, Drawable):
         for selected_block in blocks:
             selected_block.move(delta_coordinate)
             self.element_moved = True
+        self._update_spatial_index(blocks)
 
     def align_selected(self, calling_action=None):
         """
@@ -410,6 +481,7 @@ class FlowGraph(CoreFlowgraph, Drawable):
             x, y = selected_block.coordinate
             w, h = selected_block.width, selected_block.height
             selected_block.coordinate = transform(x, y, w, h)
+        self._update_spatial_index(blocks)
 
         return True
 
@@ -442,6 +514,7 @@ class FlowGraph(CoreFlowgraph, Drawable):
             x, y = Utils.get_rotated_coordinate(
                 (x - ctr_x, y - ctr_y), rotation)
             selected_block.coordinate = (x + ctr_x, y + ctr_y)
+        self.update_geometry(list(self.selected_blocks()))
         return True
 
     def remove_selected(self):
@@ -475,30 +548,36 @@ class FlowGraph(CoreFlowgraph, Drawable):
             self._new_selected_port = None
         # update highlighting
         for element in elements:
-            element.highlighted = element in selected_elements
+            highlighted = element in selected_elements
+            if element.highlighted != highlighted:
+                element.highlighted = highlighted
+                self._elements_to_draw.update(element)  # move to the (un)highlighted layer
+                self._damage_element(element)
 
     ###########################################################################
     # Draw stuff
     ###########################################################################
 
-    def update_elements_to_draw(self):
-        hide_disabled_blocks = Actions.TOGGLE_HIDE_DISABLED_BLOCKS.get_active()
-        hide_variables = Actions.TOGGLE_HIDE_VARIABLES.get_active()
-
-        def draw_order(elem):
-            return elem.highlighted, elem.is_block, elem.enabled
-
-        elements = sorted(self.get_elements(), key=draw_order)
-        del self._elements_to_draw[:]
+    def _draw_layer(self, element):
+        """Get the layer of an element in the draw list or None if it is hidden"""
+        if self._hide_disabled_blocks and not element.enabled:
+            return None  # skip hidden disabled blocks and connections
+        if self._hide_variables and (element.is_variable or element.is_import):
+            return None  # skip hidden variable and import blocks
+        return element.highlighted, element.is_block, element.enabled
 
-        for element in elements:
-            if hide_disabled_blocks and not element.enabled:
-                continue  # skip hidden disabled blocks and connections
-            if hide_variables and (element.is_variable or element.is_import):
-                continue  # skip hidden disabled blocks and connections
-            self._elements_to_draw.append(element)
+    def update_elements_to_draw(self):
+        """
+        Add new and remove deleted elements to/from the draw list,
+        move elements whose layer changed (e.g. when enabled or disabled).
+        """
+        self._hide_disabled_blocks = Actions.TOGGLE_HIDE_DISABLED_BLOCKS.get_active()
+        self._hide_variables = Actions.TOGGLE_HIDE_VARIABLES.get_active()
+        self._elements_to_draw.sync(self.get_elements())
 
     def create_labels(self, cr=None):
+        if cr:  # measure the labels at the current zoom
+            layouts.update_context(cr)
         for element in self._elements_to_draw:
             element.create_labels(cr)
 
@@ -509,42 +588,181 @@ class FlowGraph(CoreFlowgraph, Drawable):
         for element in filter(lambda x: x.is_block, self._elements_to_draw):
             element.create_shapes()
 
-        for element in filter(lambda x: not x.is_block, self._elements_to_draw):
+        connections = [element for element in self._elements_to_draw if not element.is_block]
+        for element in connections:
             element.create_shapes()
+        update_connection_geometry(connections)
+
+        self._update_spatial_index()
 
-    def _drawables(self):
-        # todo: cache that
+    @staticmethod
+    def _element_extents(element, show_comments):
+        extents = element.get_extents()
+        if element.is_block and show_comments and element.enabled:  # include the comment
+            x_min, y_min, x_max, y_max = extents
+            c_x_min, c_y_min, c_x_max, c_y_max = element.get_extents_comment()
+            extents = min(x_min, c_x_min), min(y_min, c_y_min), max(x_max, c_x_max), max(y_max, c_y_max)
+        return extents
+
+    def _update_spatial_index(self, blocks=None):
+        """
+        Update the extents of elements in the spatial index.
+
+        Args:
+            blocks: the moved blocks (their connections are updated too)
+                    or None to rebuild the index for all elements to draw
+        """
+        index = self._spatial_index
         show_comments = Actions.TOGGLE_SHOW_BLOCK_COMMENTS.get_active()
+        if blocks is None:
+            index.clear()
+            self._tile_cache.invalidate()
+            self._damage()
+            for element in self._elements_to_draw:
+                index.insert(element, self._element_extents(element, show_comments))
+            return
+
+        connections = self._connections_to_draw(blocks)
+        update_connection_geometry(connections)
+        elements = [block for block in blocks if block in index]
+        elements.extend(connections)
+        for element in elements:
+            old_extents = index.get_extents(element)
+            index.insert(element, self._element_extents(element, show_comments))
+            new_extents = index.get_extents(element)
+            self._damage(old_extents)
+            self._damage(new_extents)
+            if self._on_tiles(element, show_comments):
+                self._tile_cache.invalidate(old_extents)
+                self._tile_cache.invalidate(new_extents)
+
+    def drop_cached_tiles(self):
+        """Free the pre-rendered tiles, e.g. while the flow graph is not shown"""
+        self._tile_cache.drop()
+
+    def _on_tiles(self, element, show_comments):
+        """Check if the cached tiles show (a part of) an element"""
+        if element not in self._dynamic_elements:
+            return True
+        # the comments of dynamic blocks stay on the tiles, beneath all elements
+        return element.is_block and show_comments and element.enabled
+
+    def _connections_to_draw(self, blocks):
+        """Get the drawn connections from or to any of the blocks"""
+        blocks = set(blocks)
+        index = self._spatial_index
+        return [
+            connection for connection in self.connections if connection in index and
+            (connection.source_block in blocks or connection.sink_block in blocks)
+        ]
+
+    def _update_shapes(self, blocks):
+        """Re-create the shapes of some blocks and their connections only"""
+        for block in blocks:
+            block.create_shapes()
+        for connection in self._connections_to_draw(blocks):
+            connection.create_shapes()
+        self._update_spatial_index(blocks)
+
+    def _elements_at(self, coor, coor_m=None):
+        """
+        Get the elements which may be selected at a coordinate or within an area.
+
+        Args:
+            coor: the coordinate
+            coor_m: the opposite corner of the area or None
+
+        Returns:
+            the candidates in drawing order
+        """
+        x, y = coor
+        if coor_m is None:
+            margin = Constants.LINE_SELECT_SENSITIVITY
+            area = x - margin, y - margin, x + margin, y + margin
+        else:
+            x_m, y_m = coor_m
+            area = min(x, x_m), min(y, y_m), max(x, x_m), max(y, y_m)
+        return sorted(self._spatial_index.query(area), key=self._elements_to_draw.sort_key)
+
+    def _drawables(self, area, dynamic=frozenset(), static=True, overlay=True):
+        """
+        Get the draw functions of the elements overlapping the area, in drawing order.
+
+        Args:
+            area: the area to draw (x_min, y_min, x_max, y_max)
+            dynamic: the elements which are drawn on top of the cached tiles
+            static: include the elements which are not dynamic and all comments
+            overlay: include the dynamic and selected elements and the new connection
+        """
+        show_comments = Actions.TOGGLE_SHOW_BLOCK_COMMENTS.get_active() and detail.level == detail.FULL
         hide_disabled_blocks = Actions.TOGGLE_HIDE_DISABLED_BLOCKS.get_active()
-        for element in self._elements_to_draw:
-            if element.is_block and show_comments and element.enabled:
-                yield element.draw_comment
-        if self._new_connection is not None:
+        visible = sorted(self._spatial_index.query(area), key=self._elements_to_draw.sort_key)
+        layer = [element for element in visible
+                 if (overlay if element in dynamic else static)]
+        if static:  # the comments of all blocks are beneath all elements
+            for element in visible:
+                if element.is_block and show_comments and element.enabled:
+                    yield element.draw_comment
+        if overlay and self._new_connection is not None:
             yield self._new_connection.draw
-        for element in self._elements_to_draw:
-            if element not in self.selected_elements:
-                yield element.draw
+        for element in layer:  # the selected elements are highlighted, on the top layers
+            yield element.draw
+        if not overlay:
+            return
         for element in self.selected_elements:
-            if element.enabled or not hide_disabled_blocks:
-                yield element.draw
+            if element not in self._elements_to_draw:  # selected, but hidden
+                if element.enabled or not hide_disabled_blocks:
+                    yield element.draw
 
-    def draw(self, cr):
-        """Draw blocks connections comment and select rectangle"""
-        for draw_element in self._drawables():
+    def _draw_elements(self, cr, area, **kwargs):
+        for draw_element in self._drawables(area, **kwargs):
             cr.save()
             draw_element(cr)
             cr.restore()
 
-        draw_multi_select_rectangle = (
-            self.mouse_pressed and
-            (not self.selected_elements or self.drawing_area.ctrl_mask) and
-            not self._new_connection
-        )
-        if draw_multi_select_rectangle:
-            x1, y1 = self.press_coor
-            x2, y2 = self.coordinate
-            x, y = int(min(x1, x2)), int(min(y1, y2))
-            w, h = int(abs(x1 - x2)), int(abs(y1 - y2))
+    def _update_dynamic_elements(self):
+        """
+        Find the elements to draw on top of the cached tiles: the selected
+        elements, which are highlighted and on the top layers anyway.
+        Connections to selected blocks stay on the tiles beneath the blocks,
+        the tiles are dropped where they move.
+        Tiles showing elements which change their layer are dropped.
+        """
+        dynamic = set(self.selected_elements)
+        for element in dynamic.symmetric_difference(self._dynamic_elements):
+            extents = self._spatial_index.get_extents(element)
+            if extents is not None:
+                self._tile_cache.invalidate(extents)
+        self._dynamic_elements = dynamic
+        return dynamic
+
+    def draw(self, cr, cached=False):
+        """
+        Draw blocks connections comment and select rectangle.
+        Only the elements within the clip region of cr are drawn.
+
+        Args:
+            cr: the cairo context
+            cached: draw all but the selected elements from cached tiles (for the canvas)
+        """
+        x_min, y_min, x_max, y_max = cr.clip_extents()
+        margin = 2 * cr.get_line_width()  # strokes extend beyond the extents
+        area = x_min - margin, y_min - margin, x_max + margin, y_max + margin
+        layouts.update_context(cr)  # for all labels, instead of one update per layout
+        detail.update_level(cr, *self._detail_zooms)
+
+        if cached:
+            dynamic = self._update_dynamic_elements()
+            self._tile_cache.draw(cr, self.drawing_area.zoom_factor, area, functools.partial(
+                self._draw_elements, dynamic=dynamic, overlay=False))
+            self._draw_elements(cr, area, dynamic=dynamic, static=False)
+        else:
+            self._draw_elements(cr, area)
+
+        multi_select_rectangle = self._multi_select_rectangle()
+        if multi_select_rectangle:
+            x1, y1, x2, y2 = multi_select_rectangle
+            x, y, w, h = x1, y1, x2 - x1, y2 - y1
             cr.set_source_rgba(
                 colors.HIGHLIGHT_COLOR[0],
                 colors.HIGHLIGHT_COLOR[1],
@@ -556,6 +774,54 @@ class FlowGraph(CoreFlowgraph, Drawable):
             cr.rectangle(x, y, w, h)
             cr.stroke()
 
+    def _multi_select_rectangle(self):
+        """Get the extents of the rubber band or None if it is not shown"""
+        draw_multi_select_rectangle = (
+            self.mouse_pressed and
+            (not self.selected_elements or self.drawing_area.ctrl_mask) and
+            not self._new_connection
+        )
+        if not draw_multi_select_rectangle:
+            return None
+        x1, y1 = self.press_coor
+        x2, y2 = self.coordinate
+        return int(min(x1, x2)), int(min(y1, y2)), int(max(x1, x2)), int(max(y1, y2))
+
+    def _damage(self, extents=None):
+        """
+        Mark an area of the canvas to be redrawn.
+
+        Args:
+            extents: the area (x_min, y_min, x_max, y_max) or None for all of the canvas
+        """
+        if extents is None:
+            self._damaged = None
+        elif self._damaged is not None:
+            self._damaged.append(extents)
+
+    def _damage_element(self, element):
+        extents = self._spatial_index.get_extents(element)
+        if extents is not None:
+            self._damage(extents)
+
+    def _damage_new_connection(self):
+        if self._new_connection is not None:
+            self._damage(self._new_connection.get_extents())
+
+    def queue_draw_damaged(self, everything=False):
+        """
+        Redraw the areas of the canvas which were changed since the last call.
+
+        Args:
+            everything: redraw all of the canvas anyway
+        """
+        damaged, self._damaged = self._damaged, []
+        if damaged is None or everything:
+            self.drawing_area.queue_draw()
+            return
+        for extents in damaged:
+            self.drawing_area.queue_draw_extents(extents)
+
     ##########################################################################
     # selection handling
     ##########################################################################
@@ -582,8 +848,8 @@ class FlowGraph(CoreFlowgraph, Drawable):
 
             if self._old_selected_port:
                 self._old_selected_port.force_show_label = False
-                self.create_shapes()
-                self.drawing_area.queue_draw()
+                self._update_shapes([self._old_selected_port.parent_block])
+                self.queue_draw_damaged()
             elif self._new_selected_port:
                 self._new_selected_port.force_show_label = True
 
@@ -627,7 +893,7 @@ class FlowGraph(CoreFlowgraph, Drawable):
         selected_port = None
         selected = set()
         # check the elements
-        for element in reversed(self._elements_to_draw):
+        for element in reversed(self._elements_at(coor, coor_m)):
             selected_element = element.what_is_selected(coor, coor_m)
             if not selected_element:
                 continue
@@ -645,7 +911,9 @@ class FlowGraph(CoreFlowgraph, Drawable):
             selected.remove(selected_port.parent_block)
             self._new_connection = DummyConnection(
                 selected_port, coordinate=coor)
-            self.drawing_area.queue_draw()
+            self._new_connection.create_shapes()
+            self._damage_new_connection()
+            self.queue_draw_damaged()
         # update selected ports
         if selected_port is not self._new_selected_port:
             self._old_selected_port = self._new_selected_port
@@ -716,8 +984,9 @@ class FlowGraph(CoreFlowgraph, Drawable):
             self.update_selected_elements()
             self.mouse_pressed = False
         if self._new_connection:
+            self._damage_new_connection()
             self._new_connection = None
-            self.drawing_area.queue_draw()
+            self.queue_draw_damaged()
         self._context_menu.popup(event)
 
     def handle_mouse_selector_press(self, double_click, coordinate):
@@ -745,14 +1014,18 @@ class FlowGraph(CoreFlowgraph, Drawable):
         And update the selected flowgraph elements.
         """
         self.coordinate = coordinate
+        multi_select_rectangle = self._multi_select_rectangle()
+        if multi_select_rectangle:
+            self._damage(multi_select_rectangle)
         self.mouse_pressed = False
         if self.element_moved:
             Actions.BLOCK_MOVE()
             self.element_moved = False
         self.update_selected_elements()
         if self._new_connection:
+            self._damage_new_connection()
             self._new_connection = None
-            self.drawing_area.queue_draw()
+        self.queue_draw_damaged()
 
     def handle_mouse_motion(self, coordinate):
         """
@@ -768,31 +1041,36 @@ class FlowGraph(CoreFlowgraph, Drawable):
         if self.mouse_pressed:
             redraw = redraw or self._handle_mouse_motion_drag(coordinate)
         if redraw:
-            self.drawing_area.queue_draw()
+            self.queue_draw_damaged()
 
     def _handle_mouse_motion_move(self, coordinate):
         # only continue if mouse-over stuff is enabled (just the auto-hide port label stuff for now)
-        redraw = False
-        for element in self._elements_to_draw:
+        changed = []  # elements whose shape changed
+        for element in self._elements_at(coordinate):
             over_element = element.what_is_selected(coordinate)
             if not over_element:
                 continue
             if over_element != self.element_under_mouse:  # over sth new
-                if self.element_under_mouse:
-                    redraw |= self.element_under_mouse.mouse_out() or False
+                if self.element_under_mouse and self.element_under_mouse.mouse_out():
+                    changed.append(self.element_under_mouse)
                 self.element_under_mouse = over_element
-                redraw |= over_element.mouse_over() or False
+                if over_element.mouse_over():
+                    changed.append(over_element)
             break
         else:
             if self.element_under_mouse:
-                redraw |= self.element_under_mouse.mouse_out() or False
+                if self.element_under_mouse.mouse_out():
+                    changed.append(self.element_under_mouse)
                 self.element_under_mouse = None
         if not Actions.TOGGLE_AUTO_HIDE_PORT_LABELS.get_active():
             return
-        if redraw:
-            # self.create_labels()
-            self.create_shapes()
-        return redraw
+        if changed:
+            # only port labels are shown or hidden, re-create the shapes of their blocks
+            self._update_shapes({
+                element.parent_block if element.is_port else element for element in changed
+                if element.is_port or element.is_block
+            })
+        return bool(changed)
 
     def _handle_mouse_motion_drag(self, coordinate):
         redraw = False
@@ -802,11 +1080,14 @@ class FlowGraph(CoreFlowgraph, Drawable):
             redraw = True
 
         if self._new_connection:
+            self._damage_new_connection()
             e = self.element_under_mouse
             if e and e.is_port and e.is_sink:
                 self._new_connection.update(sink_port=self.element_under_mouse)
             else:
                 self._new_connection.update(coordinate=coordinate, rotation=0)
+            self._new_connection.create_shapes()  # for its extents
+            self._damage_new_connection()
             return True
         # move the selected elements and record the new coordinate
         x, y = coordinate
@@ -822,23 +1103,25 @@ class FlowGraph(CoreFlowgraph, Drawable):
                 dX, dY = int(round(dX)), int(round(dY))
 
             if dX != 0 or dY != 0:
+                multi_select_rectangle = self._multi_select_rectangle()
                 self.move_selected((dX, dY))
                 self.coordinate = (X + dX, Y + dY)
+                if multi_select_rectangle:
+                    self._damage(multi_select_rectangle)
+                    self._damage(self._multi_select_rectangle())
                 redraw = True
         return redraw
 
     def get_extents(self):
-        show_comments = Actions.TOGGLE_SHOW_BLOCK_COMMENTS.get_active()
+        """
+        Get the extents of the elements to draw and their shown comments.
+        The spatial index keeps them up to date as elements are moved, added or removed.
 
-        def sub_extents():
-            for element in self._elements_to_draw:
-                yield element.get_extents()
-                if element.is_block and show_comments and element.enabled:
-                    yield element.get_extents_comment()
-
-        extent = 10000000, 10000000, 0, 0
-        cmps = (min, min, max, max)
-        for sub_extent in sub_extents():
-            extent = [cmp(xy, e_xy)
-                      for cmp, xy, e_xy in zip(cmps, extent, sub_extent)]
-        return tuple(extent)
+        Returns:
+            a tuple (x_min, y_min, x_max, y_max), x_max and y_max are at least 0
+        """
+        extents = self._spatial_index.get_bounds()
+        if extents is None:
+            return 10000000, 10000000, 0, 0
+        x_min, y_min, x_max, y_max = extents
+        return min(x_min, 10000000), min(y_min, 10000000), max(x_max, 0), max(y_max, 0)
@@ -0,0 +1,75 @@
+"""
+Copyright 2016 Free Software Foundation, Inc.
+This file is part of GNU Radio
+
+SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+
+from gi.repository import Pango, PangoCairo
+
+_context = None  # Pango context shared by all layouts on the canvas
+_zoom = 1.0  # scale of the context
+
+
+def get_context():
+    """Get the Pango context shared by all layouts on the canvas"""
+    global _context
+    if _context is None:
+        _context = PangoCairo.FontMap.get_default().create_context()
+    return _context
+
+
+def update_context(cr):
+    """
+    Match the shared context to the scale of a cairo context (e.g. after zooming).
+    Layouts created or measured afterwards use the font metrics of this scale.
+
+    Args:
+        cr: the cairo context of the canvas
+    """
+    global _zoom
+    PangoCairo.update_context(cr, get_context())
+    _zoom = cr.get_matrix().xx
+
+
+class CachedLayout(object):
+    """
+    A Pango layout which is re-created only if its markup or the zoom changed.
+    """
+
+    __slots__ = ('layout', 'size', '_key', '_setup')
+
+    def __init__(self, setup=None):
+        """
+        CachedLayout constructor.
+
+        Args:
+            setup: an optional function to prepare a new layout before the markup is set
+        """
+        self.layout = None
+        self.size = 0, 0  # of the layout right after setting the markup (in Pango units)
+        self._key = None
+        self._setup = setup
+
+    def update(self, markup):
+        """
+        Get a layout for the markup.
+
+        Args:
+            markup: the Pango markup (including the font)
+
+        Returns:
+            the (possibly cached) layout
+        """
+        key = markup, _zoom
+        if key != self._key:
+            layout = Pango.Layout.new(get_context())
+            if self._setup:
+                self._setup(layout)
+            layout.set_markup(markup)
+            self.layout, self.size, self._key = layout, layout.get_size(), key
+        return self.layout
+
+    def clear(self):
+        self.layout, self.size, self._key = None, (0, 0), None
@@ -9,10 +9,11 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 import math
 
-from gi.repository import Gtk, PangoCairo, Pango
+from gi.repository import PangoCairo, Pango
 
-from . import colors
+from . import colors, detail
 from .drawable import Drawable
+from .layouts import CachedLayout
 from .. import Actions, Utils, Constants
 
 from ...core.utils.descriptors import nop_write
@@ -43,6 +44,8 @@ class Port(CorePort, Drawable):
         self.width_with_label = self.height = 0
 
         self.label_layout = None
+        self._cached_layout = CachedLayout(
+            lambda layout: layout.set_alignment(Pango.Alignment.CENTER))
 
     @property
     def width(self):
@@ -93,13 +96,7 @@ class Port(CorePort, Drawable):
         }[self.connector_direction]
 
     def create_labels(self, cr=None):
-        """Create the labels for the socket."""
-        self.label_layout = Gtk.DrawingArea().create_pango_layout('')
-        self.label_layout.set_alignment(Pango.Alignment.CENTER)
-
-        if cr:
-            PangoCairo.update_layout(cr, self.label_layout)
-
+        """Create the labels for the socket (the layout is only re-created if its markup changed)."""
         if self.domain in (Constants.GR_MESSAGE_DOMAIN, Constants.GR_STREAM_DOMAIN):
             self._line_width_factor = 1.0
         else:
@@ -107,11 +104,10 @@ class Port(CorePort, Drawable):
 
         self._update_colors()
 
-        layout = self.label_layout
-        layout.set_markup('<span font_desc="{font}">{name}</span>'.format(
+        self.label_layout = self._cached_layout.update('<span font_desc="{font}">{name}</span>'.format(
             name=Utils.encode(self.name), font=Constants.PORT_FONT
         ))
-        label_width, label_height = self.label_layout.get_size()
+        label_width, label_height = self._cached_layout.size
 
         self.width = 2 * Constants.PORT_LABEL_PADDING + label_width / Pango.SCALE
         self.height = (2 * Constants.PORT_LABEL_PADDING + label_height *
@@ -137,8 +133,8 @@ class Port(CorePort, Drawable):
         cr.set_source_rgba(*border_color)
         cr.stroke()
 
-        if not self._show_label:
-            return  # this port is folded (no label)
+        if not self._show_label or detail.level != detail.FULL:
+            return  # this port is folded (no label) or zoomed out
 
         if self.is_vertical():
             cr.rotate(-math.pi / 2)
@@ -146,7 +142,6 @@ class Port(CorePort, Drawable):
         cr.translate(*self._label_layout_offsets)
 
         cr.set_source_rgba(*self._font_color)
-        PangoCairo.update_layout(cr, self.label_layout)
         PangoCairo.show_layout(cr, self.label_layout)
 
     @property
@@ -0,0 +1,171 @@
+"""
+Copyright 2016 Free Software Foundation, Inc.
+This file is part of GNU Radio
+
+SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+
+from collections import defaultdict
+
+from ..Constants import SPATIAL_INDEX_CELL_SIZE
+
+# items spanning more cells than this are kept in a separate list
+_MAX_CELLS_PER_ITEM = 64
+
+
+class SpatialIndex(object):
+    """
+    A uniform grid over the canvas to find the elements in a rectangular area.
+    Each item is stored with its extents (x_min, y_min, x_max, y_max) in all
+    cells it overlaps. The bounds of all items are kept up to date as items
+    are added or moved and re-calculated only if an outermost item moved inwards
+    or was removed.
+    """
+
+    def __init__(self, cell_size=SPATIAL_INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)  # (column, row) -> items
+        self._large = set()  # items spanning too many cells
+        self._extents = {}  # item -> extents
+        self._bounds = None  # of all items, None if there are none
+        self._bounds_stale = False  # the bounds need to be re-calculated
+
+    def __len__(self):
+        return len(self._extents)
+
+    def __contains__(self, item):
+        return item in self._extents
+
+    def _cell_range(self, extents):
+        x_min, y_min, x_max, y_max = extents
+        size = self.cell_size
+        return (int(x_min // size), int(y_min // size),
+                int(x_max // size), int(y_max // size))
+
+    def clear(self):
+        self._cells.clear()
+        self._large.clear()
+        self._extents.clear()
+        self._bounds = None
+        self._bounds_stale = False
+
+    def insert(self, item, extents):
+        """
+        Add an item or update its extents.
+
+        Args:
+            item: the item (hashable)
+            extents: a tuple (x_min, y_min, x_max, y_max)
+        """
+        old_extents = self._extents.get(item)
+        if old_extents == extents:
+            return
+        self._update_bounds(old_extents, extents)
+        if old_extents is not None:
+            self._remove(item)
+        self._extents[item] = extents
+
+        col_min, row_min, col_max, row_max = self._cell_range(extents)
+        if (col_max - col_min + 1) * (row_max - row_min + 1) > _MAX_CELLS_PER_ITEM:
+            self._large.add(item)
+            return
+        for col in range(col_min, col_max + 1):
+            for row in range(row_min, row_max + 1):
+                self._cells[col, row].add(item)
+
+    def remove(self, item):
+        """Remove an item, if it is in the index"""
+        extents = self._extents.get(item)
+        if extents is None:
+            return
+        self._update_bounds(extents, None)
+        self._remove(item)
+
+    def _remove(self, item):
+        extents = self._extents.pop(item)
+        if item in self._large:
+            self._large.discard(item)
+            return
+        col_min, row_min, col_max, row_max = self._cell_range(extents)
+        for col in range(col_min, col_max + 1):
+            for row in range(row_min, row_max + 1):
+                cell = self._cells[col, row]
+                cell.discard(item)
+                if not cell:
+                    del self._cells[col, row]
+
+    def _update_bounds(self, old_extents, new_extents):
+        """Update the bounds for an item changing its extents (None if added or removed)"""
+        if self._bounds_stale:
+            return
+        bounds = self._bounds
+        if old_extents is not None:
+            x_min, y_min, x_max, y_max = bounds
+            o_x_min, o_y_min, o_x_max, o_y_max = old_extents
+            n_x_min, n_y_min, n_x_max, n_y_max = new_extents or (
+                float('inf'), float('inf'), float('-inf'), float('-inf'))
+            if (o_x_min == x_min < n_x_min or o_y_min == y_min < n_y_min or
+                    o_x_max == x_max > n_x_max or o_y_max == y_max > n_y_max):
+                self._bounds_stale = True  # an outermost item moved inwards
+                return
+        if new_extents is not None:
+            if bounds is None:
+                self._bounds = tuple(new_extents)
+            else:
+                self._bounds = (min(bounds[0], new_extents[0]), min(bounds[1], new_extents[1]),
+                                max(bounds[2], new_extents[2]), max(bounds[3], new_extents[3]))
+
+    def get_bounds(self):
+        """
+        Get the bounds of all items.
+
+        Returns:
+            a tuple (x_min, y_min, x_max, y_max) or None if the index is empty
+        """
+        if self._bounds_stale:
+            if self._extents:
+                x_mins, y_mins, x_maxs, y_maxs = zip(*self._extents.values())
+                self._bounds = min(x_mins), min(y_mins), max(x_maxs), max(y_maxs)
+            else:
+                self._bounds = None
+            self._bounds_stale = False
+        return self._bounds
+
+    def get_extents(self, item):
+        """Get the stored extents of an item or None"""
+        return self._extents.get(item)
+
+    def query(self, extents):
+        """
+        Find the items overlapping a rectangular area.
+
+        Args:
+            extents: the area as a tuple (x_min, y_min, x_max, y_max)
+
+        Returns:
+            a set of items
+        """
+        x_min, y_min, x_max, y_max = extents
+        col_min, row_min, col_max, row_max = self._cell_range(extents)
+
+        candidates = set(self._large)
+        if (col_max - col_min + 1) * (row_max - row_min + 1) > len(self._cells):
+            for (col, row), cell in self._cells.items():
+                if col_min <= col <= col_max and row_min <= row <= row_max:
+                    candidates.update(cell)
+        else:
+            cells = self._cells
+            for col in range(col_min, col_max + 1):
+                for row in range(row_min, row_max + 1):
+                    cell = cells.get((col, row))
+                    if cell:
+                        candidates.update(cell)
+
+        found = set()
+        all_extents = self._extents
+        for item in candidates:
+            i_x_min, i_y_min, i_x_max, i_y_max = all_extents[item]
+            if i_x_min <= x_max and x_min <= i_x_max and i_y_min <= y_max and y_min <= i_y_max:
+                found.add(item)
+        return found
@@ -0,0 +1,125 @@
+"""
+Copyright 2016 Free Software Foundation, Inc.
+This file is part of GNU Radio
+
+SPDX-License-Identifier: GPL-2.0-or-later
+
+"""
+
+import math
+from collections import OrderedDict
+
+import cairo
+
+from .colors import FLOWGRAPH_BACKGROUND_COLOR
+from ..Constants import CANVAS_TILE_SIZE, CANVAS_TILE_CACHE_FACTOR
+
+# pixels drawn outside the extents of an element (e.g. by strokes)
+_MARGIN = 4
+
+
+class TileCache(object):
+    """
+    Off-screen surfaces with pre-rendered parts of the canvas.
+    The canvas is split into square tiles (in pixels, at the current zoom).
+    A tile is rendered when it is first drawn and kept until the area it
+    covers is invalidated, the zoom changes or it is the least recently
+    used one of too many tiles. The number of tiles kept follows the size
+    of the viewport: cache_factor times the most tiles drawn at once since
+    the zoom changed (a full repaint draws all visible tiles, a partial
+    one less).
+    """
+
+    def __init__(self, tile_size=CANVAS_TILE_SIZE, cache_factor=CANVAS_TILE_CACHE_FACTOR):
+        self.tile_size = tile_size
+        self.cache_factor = cache_factor
+        self.max_tiles = 0
+        self._tiles = OrderedDict()  # (column, row) -> surface, least recently used first
+        self._zoom = None
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def _tile_range(self, extents, zoom):
+        x_min, y_min, x_max, y_max = extents
+        scale = zoom / self.tile_size
+        return (math.floor(x_min * scale), math.floor(y_min * scale),
+                math.floor(x_max * scale), math.floor(y_max * scale))
+
+    def drop(self):
+        """Drop all tiles and the limit learned from the viewport (e.g. when hidden)"""
+        self._tiles.clear()
+        self.max_tiles = 0
+
+    def invalidate(self, extents=None):
+        """
+        Drop the tiles overlapping an area.
+
+        Args:
+            extents: the area (x_min, y_min, x_max, y_max) in canvas coordinates
+                     or None to drop all tiles
+        """
+        if extents is None or self._zoom is None:
+            self._tiles.clear()
+            return
+        x_min, y_min, x_max, y_max = extents
+        margin = _MARGIN / self._zoom
+        col_min, row_min, col_max, row_max = self._tile_range(
+            (x_min - margin, y_min - margin, x_max + margin, y_max + margin), self._zoom)
+        for key in [key for key in self._tiles
+                    if col_min <= key[0] <= col_max and row_min <= key[1] <= row_max]:
+            del self._tiles[key]
+
+    def draw(self, cr, zoom, area, render):
+        """
+        Draw the tiles covering an area, rendering missing ones.
+
+        Args:
+            cr: the cairo context, scaled by zoom
+            zoom: the zoom factor of the canvas
+            area: the area to draw (x_min, y_min, x_max, y_max) in canvas coordinates
+            render: a function (cr, area) to render the content of a tile,
+                    with cr set up like the cr of the canvas
+        """
+        if zoom != self._zoom:
+            self.drop()
+            self._zoom = zoom
+        size = self.tile_size
+        col_min, row_min, col_max, row_max = self._tile_range(area, zoom)
+
+        cr.save()
+        cr.scale(1 / zoom, 1 / zoom)  # tiles are in pixels
+        for col in range(col_min, col_max + 1):
+            for row in range(row_min, row_max + 1):
+                surface = self._tiles.get((col, row))
+                if surface is None:
+                    surface = self._render_tile(cr, col, row, zoom, render)
+                else:
+                    self._tiles.move_to_end((col, row))
+                cr.set_source_surface(surface, col * size, row * size)
+                cr.rectangle(col * size, row * size, size, size)
+                cr.fill()
+        cr.restore()
+
+        visible = (col_max - col_min + 1) * (row_max - row_min + 1)
+        self.max_tiles = max(self.max_tiles, self.cache_factor * visible)
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def _render_tile(self, cr, col, row, zoom, render):
+        size = self.tile_size
+        surface = cr.get_target().create_similar(cairo.CONTENT_COLOR, size, size)
+        tile_cr = cairo.Context(surface)
+        tile_cr.set_source_rgba(*FLOWGRAPH_BACKGROUND_COLOR)
+        tile_cr.paint()
+
+        tile_cr.translate(-col * size, -row * size)
+        tile_cr.scale(zoom, zoom)
+        tile_cr.set_line_width(2.0 / zoom)
+        margin = _MARGIN
+        area = ((col * size - margin) / zoom, (row * size - margin) / zoom,
+                ((col + 1) * size + margin) / zoom, ((row + 1) * size + margin) / zoom)
+        render(tile_cr, area)
+
+        self._tiles[col, row] = surface
+        return surface
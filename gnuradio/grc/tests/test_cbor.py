@@ -0,0 +1,104 @@
+# Copyright 2016 Free Software Foundation, Inc.
+# This file is part of GNU Radio
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+"""Round trips of flow graph data through the binary format, compared to YAML"""
+
+import io
+import os
+
+import pytest
+
+from gnuradio.grc.core.io import cbor, grc, yaml
+from gnuradio.grc.core.platform import Platform
+
+BLOCKS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'blocks')
+
+
+@pytest.fixture(scope='module')
+def platform():
+    platform = Platform(name='GRC Test', version='v3.10.0.0', version_parts=('3', '10', '0'))
+    platform.build_library([BLOCKS_DIR])
+    return platform
+
+
+@pytest.fixture
+def flow_graph(platform):
+    flow_graph = platform.make_flow_graph()
+    flow_graph.options_block.params['id'].set_value('round_trip')
+    flow_graph.options_block.params['title'].set_value('Round trip: "äöü" → ✓')
+    for index, value in enumerate(['42', '3.25', "'text'", '[1, 2, 3]', '-7']):
+        block = flow_graph.new_block('variable')
+        block.params['id'].set_value('variable_{}'.format(index))
+        block.params['value'].set_value(value)
+        block.states['coordinate'] = (8 * index, 16 * index)
+    note = flow_graph.new_block('note')
+    note.params['id'].set_value('note_0')
+    note.params['note'].set_value('multi\nline\n  note')
+    note.states['state'] = 'disabled'
+    source = flow_graph.new_block('pad_source')
+    source.params['id'].set_value('pad_source_0')
+    sink = flow_graph.new_block('pad_sink')
+    sink.params['id'].set_value('pad_sink_0')
+    flow_graph.rewrite()
+    flow_graph.connect(source.sources[0], sink.sinks[0])
+    return flow_graph
+
+
+def _yaml_round_trip(data):
+    stream = io.StringIO()
+    grc.dump(data, stream)
+    return yaml.safe_load(stream.getvalue())
+
+
+def test_round_trip_matches_yaml(flow_graph):
+    data = flow_graph.export_data()
+    assert cbor.loads(cbor.dumps(data)) == _yaml_round_trip(data)
+
+
+def test_round_trip_imports_like_yaml(platform, flow_graph):
+    data = flow_graph.export_data()
+    from_binary, from_yaml = platform.make_flow_graph(), platform.make_flow_graph()
+    from_binary.import_data(cbor.loads(cbor.dumps(data)))
+    from_yaml.import_data(_yaml_round_trip(data))
+    assert from_binary.export_data() == from_yaml.export_data()
+    assert len(from_binary.blocks) == len(flow_graph.blocks)
+    assert len(from_binary.connections) == 1
+
+
+def test_save_and_parse(platform, flow_graph, tmp_path):
+    data = flow_graph.export_data()
+    for extension in ('.grc', '.grcb'):
+        filename = str(tmp_path / ('round_trip' + extension))
+        platform.save_flow_graph(filename, flow_graph)
+        assert platform.parse_flow_graph(filename) == _yaml_round_trip(data)
+
+
+@pytest.mark.parametrize('value', [
+    0, 23, 24, 255, 256, 65536, 2 ** 32, 2 ** 64 - 1, -1, -25, -2 ** 64,
+    0.5, -1e300, float('inf'), True, False, None, '', 'äöü', 'x' * 300,
+    [], {}, [1, [2, [3]]], {'a': {'b': [None]}},
+])
+def test_values(value):
+    assert cbor.loads(cbor.dumps(value)) == value
+
+
+def test_tuples_load_as_lists():
+    assert cbor.loads(cbor.dumps((1, (2, 3)))) == [1, [2, 3]]
+
+
+def test_truncated_data(flow_graph):
+    encoded = cbor.dumps(flow_graph.export_data())
+    for end in range(len(cbor.MAGIC), len(encoded)):
+        with pytest.raises(cbor.DecodeError):
+            cbor.loads(encoded[:end])
+
+
+def test_invalid_data():
+    with pytest.raises(cbor.DecodeError):
+        cbor.loads(b'not cbor')
+    with pytest.raises(cbor.DecodeError):
+        cbor.loads(cbor.dumps(1) + b'\x00')
+    with pytest.raises(TypeError):
+        cbor.dumps({1, 2})